@@ -5,7 +5,15 @@ Dev VNC Server - 通用开发用远程桌面服务 / Remote desktop service for
 __version__ = "1.0.0"
 __author__ = "Henry"
 
-from .server import DevVNCServer
-from .config import DevVNCConfig
-
 __all__ = ["DevVNCServer", "DevVNCConfig", "__version__"]
+
+
+def __getattr__(name: str):
+    """延迟导入，保持 CLI 启动轻量 / Lazy imports keep CLI startup lean"""
+    if name == "DevVNCServer":
+        from .server import DevVNCServer
+        return DevVNCServer
+    if name == "DevVNCConfig":
+        from .config import DevVNCConfig
+        return DevVNCConfig
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,7 +7,6 @@ import sys
 from typing import List, Optional
 
 from . import __version__
-from .server import DevVNCServer
 
 
 def main(args: Optional[List[str]] = None) -> int:
@@ -21,7 +20,11 @@ def main(args: Optional[List[str]] = None) -> int:
   devvnc start                  # 启动服务
   devvnc stop                   # 停止服务
   devvnc status                 # 查看状态
+  devvnc status --json --watch  # 以 JSON 行推送状态变化
   devvnc run python app.py      # 在 VNC 环境中运行命令
+  devvnc record start           # 开始录制
+  devvnc record stop            # 停止录制
+  devvnc replay rec.dvr --export frames/  # 导出 PPM 帧序列
 
 环境变量:
   DEV_VNC_DISPLAY      显示器编号 (默认: 99)
@@ -52,6 +55,18 @@ def main(args: Optional[List[str]] = None) -> int:
     
     # status
     status_parser = subparsers.add_parser("status", help="显示服务状态")
+    status_parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    status_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="持续推送状态变化 (每行一个 JSON 事件，需配合 --json)"
+    )
+    status_parser.add_argument(
+        "--interval",
+        type=float,
+        default=2.0,
+        help="组件未运行时的重新扫描间隔秒数 (默认: 2)"
+    )
     
     # info
     info_parser = subparsers.add_parser("info", help="显示访问信息")
@@ -73,6 +88,21 @@ def main(args: Optional[List[str]] = None) -> int:
     run_parser = subparsers.add_parser("run", help="在 VNC 环境中运行命令")
     run_parser.add_argument("cmd", nargs=argparse.REMAINDER, help="要运行的命令")
     
+    # record
+    record_parser = subparsers.add_parser("record", help="录制远程桌面")
+    record_parser.add_argument("action", choices=["start", "stop"], help="开始或停止录制")
+    record_parser.add_argument("--output", "-o", help="输出文件 (默认: 录制目录下按时间命名)")
+    record_parser.add_argument("--fps", type=float, default=5.0, help="帧率 (默认: 5)")
+    
+    # replay
+    replay_parser = subparsers.add_parser("replay", help="查看或导出录制")
+    replay_parser.add_argument("file", help="录制文件 (.dvr)")
+    replay_parser.add_argument("--export", "-o", help="导出目录 (PPM 序列)，配合 --at 时为单个文件")
+    replay_parser.add_argument("--at", type=float, help="只导出该秒数处的一帧")
+    replay_parser.add_argument("--start", type=float, default=0.0, help="起始秒数")
+    replay_parser.add_argument("--end", type=float, help="结束秒数")
+    replay_parser.add_argument("--fps", type=float, default=5.0, help="导出帧率 (默认: 5)")
+    
     # 解析参数 / Parse arguments
     parsed = parser.parse_args(args)
     
@@ -80,6 +110,19 @@ def main(args: Optional[List[str]] = None) -> int:
         parser.print_help()
         return 0
     
+    if parsed.command == "status" and parsed.watch and not parsed.json:
+        status_parser.error("--watch 需要配合 --json 使用 / --watch requires --json")
+    
+    if parsed.command in ("record", "replay") and parsed.fps <= 0:
+        subparser = record_parser if parsed.command == "record" else replay_parser
+        subparser.error("--fps 必须大于 0 / --fps must be positive")
+    
+    if parsed.command == "replay":
+        return _replay(parsed)
+    
+    # 延迟导入，--help/--version 无需加载服务器 / Lazy import: --help/--version skip the server
+    from .server import DevVNCServer
+    
     # 创建服务器实例 / Create server instance
     server = DevVNCServer()
     
@@ -94,6 +137,12 @@ def main(args: Optional[List[str]] = None) -> int:
         return 0 if server.restart() else 1
     
     elif parsed.command == "status":
+        if parsed.watch:
+            return _watch_status(server, parsed.interval)
+        if parsed.json:
+            import json
+            print(json.dumps(server.status_report()))
+            return 0
         server.show_status()
         server.show_info()
         return 0
@@ -110,6 +159,11 @@ def main(args: Optional[List[str]] = None) -> int:
         server.show_logs(parsed.type)
         return 0
     
+    elif parsed.command == "record":
+        if parsed.action == "start":
+            return 0 if server.start_recording(parsed.output, fps=parsed.fps) else 1
+        return 0 if server.stop_recording() else 1
+    
     elif parsed.command == "run":
         if not parsed.cmd:
             print("❌ 请指定要运行的命令 / Please specify a command to run")
@@ -119,5 +173,61 @@ def main(args: Optional[List[str]] = None) -> int:
     return 0
 
 
+def _watch_status(server, interval: float) -> int:
+    """以 JSON 行输出状态事件 / Print status events as JSON lines"""
+    import json
+    
+    try:
+        for event in server.watch_status(interval=interval):
+            print(json.dumps(event), flush=True)
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    return 0
+
+
+def _replay(parsed: argparse.Namespace) -> int:
+    """显示录制信息或导出帧 / Show recording info or export frames"""
+    from pathlib import Path
+    
+    from .recorder import Recording, export_frames
+    
+    try:
+        recording = Recording(parsed.file)
+    except (OSError, ValueError) as e:
+        print(f"❌ 无法读取录制: {e} / Cannot read recording")
+        return 1
+    
+    with recording:
+        if parsed.at is not None:
+            if not parsed.export:
+                print("❌ --at 需要配合 --export 使用 / --at requires --export")
+                return 1
+            try:
+                frame = recording.frame_at(parsed.at)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return 1
+            Path(parsed.export).write_bytes(recording.to_ppm(frame))
+            print(f"✅ 已导出 / Exported: {parsed.export}")
+            return 0
+        
+        if parsed.export:
+            count = export_frames(
+                recording, parsed.export, fps=parsed.fps, start=parsed.start, end=parsed.end
+            )
+            print(f"✅ 已导出 {count} 帧 / Exported {count} frames to {parsed.export}")
+            return 0
+        
+        h = recording.header
+        print(f"  文件 / File:         {parsed.file}")
+        print(f"  分辨率 / Size:       {h.width}x{h.height}")
+        print(f"  时长 / Duration:     {recording.duration:.1f}s")
+        print(f"  帧数 / Frames:       {recording.frame_count}")
+        print(f"  关键帧 / Keyframes:  {len(recording.keyframes)}")
+        if not recording.complete:
+            print("  ⚠️  录制未正常结束，已扫描恢复 / Recording was not finalized, recovered by scan")
+    return 0
+
+
 if __name__ == "__main__":
     sys.exit(main())
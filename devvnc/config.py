@@ -16,6 +16,7 @@ class DevVNCConfig:
     display_num: int = 99
     vnc_port: int = 5999
     novnc_port: int = 6080
+    websockify_port: int = 0  # 0 表示 novnc_port + 1 / 0 means novnc_port + 1
     resolution: str = "1920x1080x24"
     
     # 认证 / Authentication
@@ -28,6 +29,7 @@ class DevVNCConfig:
     log_dir: Path = field(default_factory=lambda: Path.home() / ".dev-vnc" / "logs")
     run_dir: Path = field(default_factory=lambda: Path.home() / ".dev-vnc" / "run")
     config_dir: Path = field(default_factory=lambda: Path.home() / ".config" / "dev-vnc")
+    record_dir: Path = field(default_factory=lambda: Path.home() / ".dev-vnc" / "recordings")
     
     @classmethod
     def from_env(cls) -> "DevVNCConfig":
@@ -47,6 +49,9 @@ class DevVNCConfig:
         config.display_num = int(os.environ.get("DEV_VNC_DISPLAY", config.display_num))
         config.vnc_port = int(os.environ.get("DEV_VNC_PORT", config.vnc_port))
         config.novnc_port = int(os.environ.get("DEV_VNC_NOVNC_PORT", config.novnc_port))
+        config.websockify_port = int(
+            os.environ.get("DEV_VNC_WEBSOCKIFY_PORT", config.websockify_port)
+        )
         config.resolution = os.environ.get("DEV_VNC_RESOLUTION", config.resolution)
         config.password = os.environ.get("DEV_VNC_PASSWORD", config.password)
         config.window_manager = os.environ.get("DEV_VNC_WM", config.window_manager)
@@ -55,6 +60,8 @@ class DevVNCConfig:
             config.log_dir = Path(log_dir)
         if run_dir := os.environ.get("DEV_VNC_RUN_DIR"):
             config.run_dir = Path(run_dir)
+        if record_dir := os.environ.get("DEV_VNC_RECORD_DIR"):
+            config.record_dir = Path(record_dir)
             
         return config
     
@@ -78,6 +85,8 @@ class DevVNCConfig:
                             self.vnc_port = int(value)
                         elif key == "DEV_VNC_NOVNC_PORT":
                             self.novnc_port = int(value)
+                        elif key == "DEV_VNC_WEBSOCKIFY_PORT":
+                            self.websockify_port = int(value)
                         elif key == "DEV_VNC_RESOLUTION":
                             self.resolution = value
                         elif key == "DEV_VNC_PASSWORD":
@@ -88,6 +97,8 @@ class DevVNCConfig:
                             self.log_dir = Path(value)
                         elif key == "DEV_VNC_RUN_DIR":
                             self.run_dir = Path(value)
+                        elif key == "DEV_VNC_RECORD_DIR":
+                            self.record_dir = Path(value)
         except Exception:
             pass  # 忽略解析错误 / Ignore parse errors
     
@@ -96,6 +107,11 @@ class DevVNCConfig:
         """返回 DISPLAY 环境变量值 / Return DISPLAY env value"""
         return f":{self.display_num}"
     
+    @property
+    def proxy_port(self) -> int:
+        """websockify 内部端口 / Internal websockify port"""
+        return self.websockify_port or self.novnc_port + 1
+    
     @property
     def pid_file(self) -> Path:
         """PID 文件路径 / PID file path"""
@@ -117,10 +133,12 @@ class DevVNCConfig:
             "display_num": self.display_num,
             "vnc_port": self.vnc_port,
             "novnc_port": self.novnc_port,
+            "websockify_port": self.proxy_port,
             "resolution": self.resolution,
             "password": self.password,
             "window_manager": self.window_manager,
             "log_dir": str(self.log_dir),
             "run_dir": str(self.run_dir),
             "config_dir": str(self.config_dir),
+            "record_dir": str(self.record_dir),
         }
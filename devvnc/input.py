@@ -0,0 +1,393 @@
+"""
+Dev VNC Server - XTEST 批量输入注入 / Batched XTEST input injection
+
+通过持久 X11 连接发送 XTestFakeInput 请求：事件先在本地排队，
+flush() 时一次写出，可选一次同步往返。
+Sends XTestFakeInput requests over a persistent X11 connection: events are
+queued locally and written in one go by flush(), optionally followed by a
+single sync round trip.
+
+    with server.input() as inp:
+        inp.click(1, x=200, y=100)
+        inp.type("hello world\\n")
+        inp.key("ctrl+s")
+        stats = inp.flush(sync=True)
+"""
+
+import struct
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from .x11 import X11Connection, X11Error
+
+# XTEST 请求 / XTEST request
+XTEST_FAKE_INPUT = 2
+FAKE_INPUT = struct.Struct("<BBHBBHII8xhh7xB")
+
+# 事件类型 / Event types
+KEY_PRESS = 2
+KEY_RELEASE = 3
+BUTTON_PRESS = 4
+BUTTON_RELEASE = 5
+MOTION_NOTIFY = 6
+
+NO_SYMBOL = 0
+
+# 常用键名 -> keysym / Common key names -> keysym
+KEYSYMS: Dict[str, int] = {
+    "backspace": 0xFF08, "tab": 0xFF09, "return": 0xFF0D, "enter": 0xFF0D,
+    "escape": 0xFF1B, "esc": 0xFF1B, "delete": 0xFFFF, "home": 0xFF50,
+    "left": 0xFF51, "up": 0xFF52, "right": 0xFF53, "down": 0xFF54,
+    "page_up": 0xFF55, "pageup": 0xFF55, "page_down": 0xFF56, "pagedown": 0xFF56,
+    "end": 0xFF57, "insert": 0xFF63, "menu": 0xFF67, "space": 0x20,
+    "shift": 0xFFE1, "shift_l": 0xFFE1, "shift_r": 0xFFE2,
+    "ctrl": 0xFFE3, "control": 0xFFE3, "control_l": 0xFFE3, "control_r": 0xFFE4,
+    "alt": 0xFFE9, "alt_l": 0xFFE9, "alt_r": 0xFFEA,
+    "super": 0xFFEB, "super_l": 0xFFEB, "super_r": 0xFFEC,
+    "caps_lock": 0xFFE5, "num_lock": 0xFF7F, "scroll_lock": 0xFF14,
+    "print": 0xFF61, "pause": 0xFF13,
+    **{f"f{n}": 0xFFBD + n for n in range(1, 13)},
+    # 小键盘 / Keypad
+    "kp_enter": 0xFF8D, "kp_add": 0xFFAB, "kp_subtract": 0xFFAD, "kp_multiply": 0xFFAA,
+    "kp_divide": 0xFFAF, "kp_decimal": 0xFFAE, "kp_separator": 0xFFAC,
+    **{f"kp_{n}": 0xFFB0 + n for n in range(10)},
+    # 多媒体键 / Multimedia keys
+    "xf86monbrightnessup": 0x1008FF02, "xf86monbrightnessdown": 0x1008FF03,
+    "xf86audiolowervolume": 0x1008FF11, "xf86audiomute": 0x1008FF12,
+    "xf86audioraisevolume": 0x1008FF13, "xf86audioplay": 0x1008FF14,
+    "xf86audiostop": 0x1008FF15, "xf86audioprev": 0x1008FF16, "xf86audionext": 0x1008FF17,
+    # Latin-1 标点的 X keysym 名称 / X keysym names for Latin-1 punctuation
+    "exclam": 0x21, "quotedbl": 0x22, "numbersign": 0x23, "dollar": 0x24, "percent": 0x25,
+    "ampersand": 0x26, "apostrophe": 0x27, "parenleft": 0x28, "parenright": 0x29,
+    "asterisk": 0x2A, "plus": 0x2B, "comma": 0x2C, "minus": 0x2D, "period": 0x2E,
+    "slash": 0x2F, "colon": 0x3A, "semicolon": 0x3B, "less": 0x3C, "equal": 0x3D,
+    "greater": 0x3E, "question": 0x3F, "at": 0x40, "bracketleft": 0x5B, "backslash": 0x5C,
+    "bracketright": 0x5D, "asciicircum": 0x5E, "underscore": 0x5F, "grave": 0x60,
+    "braceleft": 0x7B, "bar": 0x7C, "braceright": 0x7D, "asciitilde": 0x7E,
+    "nobreakspace": 0xA0, "exclamdown": 0xA1, "cent": 0xA2, "sterling": 0xA3,
+    "currency": 0xA4, "yen": 0xA5, "brokenbar": 0xA6, "section": 0xA7, "diaeresis": 0xA8,
+    "copyright": 0xA9, "ordfeminine": 0xAA, "guillemotleft": 0xAB, "notsign": 0xAC,
+    "hyphen": 0xAD, "registered": 0xAE, "macron": 0xAF, "degree": 0xB0, "plusminus": 0xB1,
+    "twosuperior": 0xB2, "threesuperior": 0xB3, "acute": 0xB4, "mu": 0xB5,
+    "paragraph": 0xB6, "periodcentered": 0xB7, "cedilla": 0xB8, "onesuperior": 0xB9,
+    "masculine": 0xBA, "guillemotright": 0xBB, "onequarter": 0xBC, "onehalf": 0xBD,
+    "threequarters": 0xBE, "questiondown": 0xBF, "multiply": 0xD7, "division": 0xF7,
+}
+
+SHIFT_KEYSYM = KEYSYMS["shift_l"]
+
+# 控制字符 -> keysym / Control characters -> keysym
+CHAR_KEYSYMS = {"\n": KEYSYMS["return"], "\r": KEYSYMS["return"], "\t": KEYSYMS["tab"],
+                "\b": KEYSYMS["backspace"]}
+
+
+def char_to_keysym(char: str) -> int:
+    """字符对应的 keysym / Keysym for a character"""
+    if char in CHAR_KEYSYMS:
+        return CHAR_KEYSYMS[char]
+    code = ord(char)
+    if 0x20 <= code <= 0x7E or 0xA0 <= code <= 0xFF:
+        return code  # Latin-1 keysym 与码位相同 / Latin-1 keysyms equal the code point
+    return 0x01000000 | code
+
+
+def _split_combo(combo: str) -> List[str]:
+    """拆分组合键，结尾的 ``++`` 表示加号键 / Split a combo; a trailing ``++`` is the plus key"""
+    if len(combo) == 1:
+        return [combo]
+    names = combo.split("+")
+    if combo.endswith("++"):
+        names = names[:-2] + ["+"]
+    return names
+
+
+@dataclass
+class BatchStats:
+    """单批统计 / Per-batch statistics"""
+
+    events: int
+    bytes: int
+    write_ms: float
+    sync_ms: float = 0.0
+
+    @property
+    def total_ms(self) -> float:
+        return self.write_ms + self.sync_ms
+
+
+@dataclass
+class InputStats:
+    """累计统计 / Cumulative statistics"""
+
+    batches: int = 0
+    events: int = 0
+    bytes: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last: Optional[BatchStats] = None
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.batches if self.batches else 0.0
+
+    def add(self, batch: BatchStats) -> None:
+        self.batches += 1
+        self.events += batch.events
+        self.bytes += batch.bytes
+        self.total_ms += batch.total_ms
+        self.max_ms = max(self.max_ms, batch.total_ms)
+        self.last = batch
+
+
+class InputSession:
+    """XTEST 输入会话 / XTEST input session
+
+    没有 keysym 的字符会临时映射到空闲键码，与 xdotool 的做法相同；
+    close() 时恢复原映射。
+    Characters without a keysym are bound to spare keycodes on the fly, the
+    same way xdotool does it; close() restores the original mapping.
+    """
+
+    def __init__(self, display_num: int):
+        self._conn = X11Connection(display_num)
+        try:
+            opcode = self._conn.query_extension("XTEST")
+            if opcode is None:
+                raise X11Error("X 服务器不支持 XTEST 扩展 / X server lacks the XTEST extension")
+            self._xtest = opcode
+            self._load_keymap()
+        except Exception:
+            self._conn.close()
+            raise
+
+        self._events = 0
+        self._delay_ms = 0
+        self._unsynced_delay_ms = 0  # 服务器可能仍在等待的延迟 / Delays the server may still be sleeping
+        self.stats = InputStats()
+
+    def __enter__(self) -> "InputSession":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        try:
+            if exc_type is None:
+                self.flush(sync=True)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """恢复键盘映射并关闭连接 (未 flush 的事件被丢弃)
+        Restore the keyboard mapping and close, dropping unflushed events
+        """
+        try:
+            self._conn.discard()
+            if self._original_rows:
+                for keycode, row in sorted(self._original_rows.items()):
+                    self._conn.change_keyboard_mapping(keycode, [row])
+                self._original_rows.clear()
+                with self._conn.extended_timeout(self._unsynced_delay_ms / 1000):
+                    self._conn.sync()
+        except X11Error:
+            pass  # 连接已断开，映射随服务器状态 / Connection is gone; nothing to restore
+        finally:
+            self._conn.close()
+
+    # 键盘映射 / Keyboard mapping
+
+    def _load_keymap(self) -> None:
+        rows = self._conn.get_keyboard_mapping()
+        self._min_keycode = self._conn.screen.min_keycode
+        self._per_keycode = len(rows[0]) if rows else 2
+        self._keymap: Dict[int, Tuple[int, bool]] = {}
+        self._spare: List[int] = []
+        self._spare_rows = {self._min_keycode + i: row for i, row in enumerate(rows)
+                            if not any(row)}
+        self._original_rows: Dict[int, List[int]] = {}  # 已改动的键码 / Keycodes changed so far
+        self._unsynced_spares: Set[int] = set()  # 上次同步后绑定的 / Bound since the last sync
+
+        for i, row in enumerate(rows):
+            keycode = self._min_keycode + i
+            if not any(row):
+                self._spare.append(keycode)
+                continue
+            # 第 1 列为空的字母键：大小写共用键码 / Letter keys with an empty column 1 share both cases
+            if len(row) == 1 or row[1] == NO_SYMBOL:
+                char = chr(row[0]) if row[0] < 0x100 else ""
+                lower, upper = char.lower(), char.upper()
+                if len(upper) == 1 and lower != upper:
+                    self._keymap.setdefault(ord(lower), (keycode, False))
+                    self._keymap.setdefault(ord(upper), (keycode, True))
+                    continue
+            # 只使用第 0/1 列 (无修饰 / Shift) / Only columns 0/1 (plain / Shift)
+            for column, keysym in enumerate(row[:2]):
+                if keysym != NO_SYMBOL and keysym not in self._keymap:
+                    self._keymap[keysym] = (keycode, column == 1)
+
+        self._next_spare = 0
+
+    def _lookup(self, keysym: int) -> Tuple[int, bool]:
+        """keysym -> (键码, 是否需要 Shift)，必要时重新映射 / keysym -> (keycode, needs Shift)
+
+        需要 Shift 而键盘映射中没有 Shift 键时，同样绑定到空闲键码。
+        Keysyms that need Shift are also bound to a spare keycode when the
+        keymap has no Shift key.
+        """
+        entry = self._keymap.get(keysym)
+        if entry is not None and (not entry[1] or SHIFT_KEYSYM in self._keymap):
+            return entry
+        if not self._spare:
+            raise X11Error(f"没有空闲键码映射 keysym {keysym:#x} / No spare keycode for keysym")
+
+        # 轮流复用空闲键码 / Cycle through spare keycodes
+        keycode = self._spare[self._next_spare % len(self._spare)]
+        self._next_spare += 1
+        if keycode in self._unsynced_spares:
+            # 空闲键码用完一轮：先让服务器处理完用旧映射的事件
+            # The pool wrapped: let the server process events using the old binding first
+            self.flush(sync=True)
+        for sym, (code, _) in list(self._keymap.items()):
+            if code == keycode:
+                del self._keymap[sym]
+        self._original_rows.setdefault(keycode, self._spare_rows[keycode])
+        self._unsynced_spares.add(keycode)
+        self._conn.change_keyboard_mapping(keycode, [[keysym] * self._per_keycode])
+        self._keymap[keysym] = (keycode, False)
+        return keycode, False
+
+    def _keysym(self, key: str) -> int:
+        if not key:
+            raise ValueError("组合键中有空按键名 / Empty key name in combo")
+        name = key.lower()
+        if name in KEYSYMS:
+            return KEYSYMS[name]
+        if len(key) == 1:
+            return char_to_keysym(key)
+        raise ValueError(f"未知按键: {key} / Unknown key")
+
+    # 事件 / Events
+
+    def _fake(self, event_type: int, detail: int, x: int = 0, y: int = 0, root: int = 0) -> None:
+        self._conn.queue_request(FAKE_INPUT.pack(
+            self._xtest, XTEST_FAKE_INPUT, FAKE_INPUT.size // 4,
+            event_type, detail, 0, self._delay_ms, root, x, y, 0,
+        ))
+        self._unsynced_delay_ms += self._delay_ms
+        self._delay_ms = 0
+        self._events += 1
+
+    def pause(self, ms: int) -> "InputSession":
+        """让服务器在处理下一个事件前等待 ``ms`` 毫秒 / Server-side delay before the next event"""
+        self._delay_ms += ms
+        return self
+
+    def key_down(self, key: str) -> "InputSession":
+        self._fake(KEY_PRESS, self._lookup(self._keysym(key))[0])
+        return self
+
+    def key_up(self, key: str) -> "InputSession":
+        self._fake(KEY_RELEASE, self._lookup(self._keysym(key))[0])
+        return self
+
+    def key(self, combo: str) -> "InputSession":
+        """按下并释放组合键，如 ``ctrl+shift+t`` / Press and release a combo such as ``ctrl+shift+t``
+
+        需要 Shift 的按键 (如 ``ctrl+A``) 会自动加上 Shift。
+        Keys that need Shift (e.g. ``ctrl+A``) get Shift added automatically.
+        """
+        keysyms = [self._keysym(key) for key in _split_combo(combo)]
+        codes = [self._lookup(keysym) for keysym in keysyms]
+        keycodes = [keycode for keycode, _ in codes]
+        if any(self._keymap.get(keysym) != code for keysym, code in zip(keysyms, codes)):
+            raise X11Error(f"组合键需要的空闲键码不足: {combo} / Not enough spare keycodes for combo")
+        if any(shifted for _, shifted in codes) and SHIFT_KEYSYM in self._keymap:
+            shift_code = self._keymap[SHIFT_KEYSYM][0]
+            if shift_code not in keycodes:
+                keycodes.insert(0, shift_code)
+
+        for keycode in keycodes:
+            self._fake(KEY_PRESS, keycode)
+        for keycode in reversed(keycodes):
+            self._fake(KEY_RELEASE, keycode)
+        return self
+
+    def type(self, text: str) -> "InputSession":
+        """输入文本 / Type text"""
+        shift_code = self._keymap.get(SHIFT_KEYSYM, (0, False))[0]
+        shift_held = False
+        for char in text:
+            keycode, shifted = self._lookup(char_to_keysym(char))
+            if shifted != shift_held and shift_code:
+                self._fake(KEY_PRESS if shifted else KEY_RELEASE, shift_code)
+                shift_held = shifted
+            self._fake(KEY_PRESS, keycode)
+            self._fake(KEY_RELEASE, keycode)
+        if shift_held:
+            self._fake(KEY_RELEASE, shift_code)
+        return self
+
+    def move(self, x: int, y: int) -> "InputSession":
+        """移动指针到绝对坐标 / Move the pointer to absolute coordinates"""
+        self._fake(MOTION_NOTIFY, 0, x, y, root=self._conn.screen.root)
+        return self
+
+    def move_relative(self, dx: int, dy: int) -> "InputSession":
+        """相对移动指针 / Move the pointer relatively"""
+        self._fake(MOTION_NOTIFY, 1, dx, dy)
+        return self
+
+    def button_down(self, button: int = 1) -> "InputSession":
+        self._fake(BUTTON_PRESS, button)
+        return self
+
+    def button_up(self, button: int = 1) -> "InputSession":
+        self._fake(BUTTON_RELEASE, button)
+        return self
+
+    def click(self, button: int = 1, x: Optional[int] = None, y: Optional[int] = None,
+              count: int = 1) -> "InputSession":
+        """点击，可先移动到 (x, y) / Click, optionally moving to (x, y) first"""
+        if x is not None and y is not None:
+            self.move(x, y)
+        for _ in range(count):
+            self.button_down(button)
+            self.button_up(button)
+        return self
+
+    def scroll(self, dy: int = 0, dx: int = 0) -> "InputSession":
+        """滚动：正数向下/向右 / Scroll: positive is down/right"""
+        for clicks, negative, positive in ((dy, 4, 5), (dx, 6, 7)):
+            button = positive if clicks > 0 else negative
+            for _ in range(abs(clicks)):
+                self.button_down(button)
+                self.button_up(button)
+        return self
+
+    def flush(self, sync: bool = False) -> BatchStats:
+        """一次写出所有排队事件 / Write all queued events in one go
+
+        ``sync=True`` 时额外往返一次，返回时服务器已处理完这批事件。
+        With ``sync=True`` a round trip follows, so the server has processed
+        the batch on return.
+        """
+        start = time.perf_counter()
+        # 服务器执行 pause() 延迟时不会回复，超时需包含这些延迟
+        # The server sleeps through pause() delays, so allow for them in the timeout
+        with self._conn.extended_timeout(self._unsynced_delay_ms / 1000):
+            written = self._conn.flush()
+            write_done = time.perf_counter()
+            if sync:
+                self._conn.sync()
+                self._unsynced_delay_ms = 0
+                self._unsynced_spares.clear()
+        end = time.perf_counter()
+
+        batch = BatchStats(
+            events=self._events,
+            bytes=written,
+            write_ms=(write_done - start) * 1000,
+            sync_ms=(end - write_done) * 1000 if sync else 0.0,
+        )
+        self._events = 0
+        self.stats.add(batch)
+        return batch
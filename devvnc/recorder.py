@@ -0,0 +1,573 @@
+"""
+Dev VNC Server - 会话录制与回放 / Session recording and playback
+
+录制格式 (.dvr)：文件头，然后是帧记录 (关键帧或按瓦片的 XOR 差分帧，
+载荷经 zlib 压缩)，结束时写入关键帧时间索引和尾部，用于快速定位。
+File format (.dvr): a header, then frame records (keyframes or tile-level
+XOR delta frames, zlib-compressed), and finally a keyframe time index plus
+trailer for seeking.
+
+    header   HEADER
+    frame    FRAME + zlib(payload)          (重复 / repeated)
+    index    FRAME(kind=INDEX) + INDEX_HEAD + INDEX_ENTRY * n
+    trailer  TRAILER
+
+未正常结束的录制 (没有尾部) 仍可顺序扫描读取。
+Recordings without a trailer (e.g. after a crash) are still readable by a
+sequential scan.
+"""
+
+import argparse
+import os
+import signal
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Deque, Iterator, List, Optional, Tuple
+
+from .x11 import PixelFormat, X11Connection, X11Error
+
+MAGIC = b"DVNCREC1"
+INDEX_MAGIC = b"DVNCIDX1"
+VERSION = 1
+
+# magic, version, width, height, tile_size, bytes_per_pixel, msb_first,
+# red/green/blue mask, start time
+HEADER = struct.Struct("<8sHHHHBB2xIIId")
+# kind, timestamp (ms), tile count, payload length
+FRAME = struct.Struct("<B3xIII")
+# frame count, duration (ms), keyframe count
+INDEX_HEAD = struct.Struct("<III")
+# timestamp (ms), file offset
+INDEX_ENTRY = struct.Struct("<IQ")
+# index offset, magic
+TRAILER = struct.Struct("<Q8s")
+# tile column, tile row
+TILE = struct.Struct("<HH")
+
+KIND_KEY = 1
+KIND_DELTA = 2
+KIND_INDEX = 3
+
+DEFAULT_FPS = 5.0
+DEFAULT_TILE_SIZE = 64
+DEFAULT_KEYFRAME_INTERVAL = 10.0
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+ZLIB_LEVEL = 6
+
+
+@dataclass
+class RecordingHeader:
+    """录制文件头 / Recording file header"""
+
+    width: int
+    height: int
+    tile_size: int
+    bytes_per_pixel: int
+    msb_first: bool
+    red_mask: int
+    green_mask: int
+    blue_mask: int
+    start_time: float
+
+    def pack(self) -> bytes:
+        return HEADER.pack(
+            MAGIC, VERSION, self.width, self.height, self.tile_size, self.bytes_per_pixel,
+            int(self.msb_first), self.red_mask, self.green_mask, self.blue_mask, self.start_time,
+        )
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "RecordingHeader":
+        if len(data) < HEADER.size:
+            # 录制进程在写出文件头前退出 / Recorder died before the header was written
+            raise ValueError("不是 devvnc 录制文件 (文件头不完整) / Not a devvnc recording (short header)")
+        (magic, version, width, height, tile_size, bpp, msb_first,
+         red, green, blue, start_time) = HEADER.unpack(data)
+        if magic != MAGIC:
+            raise ValueError("不是 devvnc 录制文件 / Not a devvnc recording")
+        if version != VERSION:
+            raise ValueError(f"不支持的录制版本 {version} / Unsupported recording version")
+        return cls(width, height, tile_size, bpp, bool(msb_first), red, green, blue, start_time)
+
+    @property
+    def stride(self) -> int:
+        return self.width * self.bytes_per_pixel
+
+    @property
+    def frame_size(self) -> int:
+        return self.stride * self.height
+
+    def tile_rect(self, col: int, row: int) -> Tuple[int, int, int, int]:
+        """瓦片的 (x, y, 宽, 高) / Tile (x, y, width, height)"""
+        x, y = col * self.tile_size, row * self.tile_size
+        return x, y, min(self.tile_size, self.width - x), min(self.tile_size, self.height - y)
+
+
+def _xor(a: bytes, b: bytes) -> bytes:
+    return (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(len(a), "little")
+
+
+def _tile_bytes(frame: bytes, header: RecordingHeader, col: int, row: int) -> bytes:
+    x, y, w, h = header.tile_rect(col, row)
+    bpp, stride = header.bytes_per_pixel, header.stride
+    start = y * stride + x * bpp
+    return b"".join(frame[o:o + w * bpp] for o in range(start, start + h * stride, stride))
+
+
+def encode_delta(
+    prev: bytes, cur: bytes, header: RecordingHeader
+) -> Tuple[int, bytes]:
+    """计算变化瓦片的 XOR 差分 / XOR deltas for the tiles that changed
+
+    先逐行比较，只对变化的行再按瓦片比较。返回 (瓦片数, 载荷)。
+    Rows are compared first and only changed rows are split into tiles.
+    Returns (tile count, payload).
+    """
+    stride, bpp, tile = header.stride, header.bytes_per_pixel, header.tile_size
+    tile_stride = tile * bpp
+    cols = (header.width + tile - 1) // tile
+
+    changed = set()
+    for y in range(header.height):
+        start = y * stride
+        end = start + stride
+        if cur[start:end] == prev[start:end]:
+            continue
+        row = y // tile
+        for col in range(cols):
+            if (col, row) in changed:
+                continue
+            a = start + col * tile_stride
+            b = min(a + tile_stride, end)
+            if cur[a:b] != prev[a:b]:
+                changed.add((col, row))
+
+    parts = []
+    for col, row in sorted(changed, key=lambda t: (t[1], t[0])):
+        parts.append(TILE.pack(col, row))
+        parts.append(_xor(
+            _tile_bytes(cur, header, col, row), _tile_bytes(prev, header, col, row)
+        ))
+    return len(changed), b"".join(parts)
+
+
+def apply_delta(frame: bytearray, payload: bytes, header: RecordingHeader) -> None:
+    """把 XOR 差分应用到帧上 / Apply an XOR delta payload to a frame in place"""
+    bpp, stride = header.bytes_per_pixel, header.stride
+    offset = 0
+    while offset < len(payload):
+        col, row = TILE.unpack_from(payload, offset)
+        offset += TILE.size
+        x, y, w, h = header.tile_rect(col, row)
+        row_bytes = w * bpp
+        start = y * stride + x * bpp
+        size = row_bytes * h
+        restored = _xor(payload[offset:offset + size], _tile_bytes(frame, header, col, row))
+        offset += size
+        for i in range(h):
+            o = start + i * stride
+            frame[o:o + row_bytes] = restored[i * row_bytes:(i + 1) * row_bytes]
+
+
+class RecordingWriter:
+    """后台线程压缩并写入帧 / Compresses and writes frames on a background thread
+
+    待压缩数据总量受 ``memory_budget`` 限制；超出时 :meth:`add_frame` 阻塞，
+    录制帧率因此下降而不是占用更多内存。
+    Pending uncompressed data is bounded by ``memory_budget``; when it is
+    exceeded :meth:`add_frame` blocks, so the effective frame rate drops
+    instead of memory growing.
+
+    写入线程出错 (如磁盘已满) 时，错误由下一次 :meth:`add_frame` 或
+    :meth:`close` 抛出。
+    If the writer thread fails (e.g. disk full), the error is raised from the
+    next :meth:`add_frame` or :meth:`close`.
+    """
+
+    def __init__(self, f: BinaryIO, header: RecordingHeader,
+                 memory_budget: int = DEFAULT_MEMORY_BUDGET):
+        self._f = f
+        self.header = header
+        self.memory_budget = memory_budget
+        self._queue: Deque[Tuple[int, int, int, bytes]] = deque()
+        self._pending = 0
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._cond = threading.Condition()
+        self._index: List[Tuple[int, int]] = []
+        self.frames = 0
+        self.last_ms = 0
+        self.bytes_raw = 0
+        self.bytes_written = HEADER.size
+
+        f.write(header.pack())
+        self._thread = threading.Thread(target=self._run, name="devvnc-recorder", daemon=True)
+        self._thread.start()
+
+    def add_frame(self, kind: int, timestamp_ms: int, tiles: int, payload: bytes) -> None:
+        """加入一帧，内存预算用尽时等待 / Queue a frame, waiting while over budget"""
+        with self._cond:
+            while (self._error is None and self._pending
+                   and self._pending + len(payload) > self.memory_budget):
+                self._cond.wait()
+            if self._error is not None:
+                raise self._error
+            self._queue.append((kind, timestamp_ms, tiles, payload))
+            self._pending += len(payload)
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        try:
+            self._write_frames()
+        except BaseException as e:
+            with self._cond:
+                self._error = e
+                self._queue.clear()
+                self._pending = 0
+                self._cond.notify_all()
+
+    def _write_frames(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                kind, timestamp_ms, tiles, payload = self._queue[0]
+
+            data = zlib.compress(payload, ZLIB_LEVEL)
+            offset = self._f.tell()
+            self._f.write(FRAME.pack(kind, timestamp_ms, tiles, len(data)))
+            self._f.write(data)
+            if kind == KIND_KEY:
+                self._index.append((timestamp_ms, offset))
+            self.frames += 1
+            self.last_ms = timestamp_ms
+            self.bytes_raw += len(payload)
+            self.bytes_written += FRAME.size + len(data)
+
+            with self._cond:
+                self._queue.popleft()
+                self._pending -= len(payload)
+                self._cond.notify_all()
+
+    def close(self, duration_ms: int = 0) -> None:
+        """写完剩余帧并追加索引 / Drain remaining frames and append the index
+
+        ``duration_ms`` 为录制结束时间，画面静止时可能晚于最后一帧。
+        ``duration_ms`` is when recording stopped, which may be after the last
+        frame if the screen was idle.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+        index_offset = self._f.tell()
+        entries = b"".join(INDEX_ENTRY.pack(ts, off) for ts, off in self._index)
+        self.last_ms = max(self.last_ms, duration_ms)
+        body = INDEX_HEAD.pack(self.frames, self.last_ms, len(self._index)) + entries
+        self._f.write(FRAME.pack(KIND_INDEX, self.last_ms, 0, len(body)))
+        self._f.write(body)
+        self._f.write(TRAILER.pack(index_offset, INDEX_MAGIC))
+        self._f.flush()
+
+
+class Recording:
+    """读取录制文件，支持按时间定位 / Read a recording with time-based seeking"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        try:
+            self.header = RecordingHeader.unpack(self._f.read(HEADER.size))
+            self._load_index()
+        except (ValueError, struct.error):
+            self._f.close()
+            raise
+
+    def __enter__(self) -> "Recording":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._f.close()
+
+    def _load_index(self) -> None:
+        self._f.seek(0, os.SEEK_END)
+        size = self._f.tell()
+        if size >= HEADER.size + TRAILER.size:
+            self._f.seek(size - TRAILER.size)
+            index_offset, magic = TRAILER.unpack(self._f.read(TRAILER.size))
+            if magic == INDEX_MAGIC:
+                self._f.seek(index_offset + FRAME.size)
+                self.frame_count, self.duration_ms, n = INDEX_HEAD.unpack(
+                    self._f.read(INDEX_HEAD.size)
+                )
+                data = self._f.read(INDEX_ENTRY.size * n)
+                self.keyframes = [INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size)
+                                  for i in range(n)]
+                self.complete = True
+                return
+
+        # 没有索引：顺序扫描帧头 / No index: scan frame headers sequentially
+        self.keyframes = []
+        self.frame_count = 0
+        self.duration_ms = 0
+        for kind, timestamp_ms, _, _, offset in self._scan(HEADER.size):
+            if kind == KIND_KEY:
+                self.keyframes.append((timestamp_ms, offset))
+            self.frame_count += 1
+            self.duration_ms = timestamp_ms
+        self.complete = False
+
+    def _scan(self, offset: int) -> Iterator[Tuple[int, int, int, int, int]]:
+        """逐个读取帧头 / Iterate frame headers: (kind, ms, tiles, length, offset)
+
+        载荷超出文件末尾的帧 (写到一半时崩溃) 视为结束。
+        A frame whose payload runs past the end of the file (a crash mid-write)
+        ends the scan.
+        """
+        size = os.fstat(self._f.fileno()).st_size
+        self._f.seek(offset)
+        while True:
+            head = self._f.read(FRAME.size)
+            if len(head) < FRAME.size:
+                return
+            kind, timestamp_ms, tiles, length = FRAME.unpack(head)
+            if kind == KIND_INDEX or offset + FRAME.size + length > size:
+                return
+            yield kind, timestamp_ms, tiles, length, offset
+            offset += FRAME.size + length
+            self._f.seek(offset)
+
+    @property
+    def duration(self) -> float:
+        return self.duration_ms / 1000.0
+
+    def frames(self, start: float = 0.0) -> Iterator[Tuple[float, bytes]]:
+        """从 ``start`` 秒开始解码帧 / Decode frames from ``start`` seconds on
+
+        第一帧是 ``start`` 时刻屏幕上的帧 (可能更早)；产生 (秒, 帧像素)。
+        The first frame is the one on screen at ``start`` (it may be older);
+        yields (seconds, frame pixels).
+        """
+        if not self.keyframes:
+            return
+        start_ms = int(start * 1000)
+        offset = self.keyframes[0][1]
+        for timestamp_ms, key_offset in self.keyframes:
+            if timestamp_ms > start_ms:
+                break
+            offset = key_offset
+
+        frame = bytearray(self.header.frame_size)
+        decoded: Optional[int] = None  # 已解码未产出的帧时间 / Decoded, not yet yielded
+        for kind, timestamp_ms, _, length, position in self._scan(offset):
+            # 下一帧晚于 start 时，当前帧才可能可见 / A frame is visible only if its successor is after start
+            if decoded is not None and timestamp_ms > start_ms:
+                yield decoded / 1000.0, bytes(frame)
+
+            self._f.seek(position + FRAME.size)
+            try:
+                payload = zlib.decompress(self._f.read(length))
+            except zlib.error as e:
+                raise ValueError(f"录制文件已损坏: {e} / Corrupt recording") from e
+            if kind == KIND_KEY:
+                frame[:] = payload
+            else:
+                apply_delta(frame, payload, self.header)
+            decoded = timestamp_ms
+
+        if decoded is not None:
+            yield decoded / 1000.0, bytes(frame)
+
+    def frame_at(self, seconds: float) -> bytes:
+        """``seconds`` 时刻显示的帧 / The frame on screen at ``seconds``"""
+        for timestamp, frame in self.frames(seconds):
+            if timestamp <= seconds:
+                return frame
+            break
+        raise ValueError(f"{seconds}s 处没有帧 / No frame at {seconds}s")
+
+    def to_ppm(self, frame: bytes) -> bytes:
+        """把帧转换为 PPM (P6) 图像 / Convert a frame to a PPM (P6) image"""
+        h = self.header
+        if h.bytes_per_pixel != 4:
+            raise ValueError("仅支持 32 位像素 / Only 32-bit pixels are supported")
+
+        rgb = bytearray(h.width * h.height * 3)
+        for channel, mask in enumerate((h.red_mask, h.green_mask, h.blue_mask)):
+            byte = (mask.bit_length() - 8) // 8
+            if h.msb_first:
+                byte = 3 - byte
+            rgb[channel::3] = frame[byte::4]
+        return f"P6\n{h.width} {h.height}\n255\n".encode() + bytes(rgb)
+
+
+class Recorder:
+    """屏幕录制器 / Screen recorder"""
+
+    def __init__(
+        self,
+        display_num: int,
+        output: str,
+        fps: float = DEFAULT_FPS,
+        tile_size: int = DEFAULT_TILE_SIZE,
+        keyframe_interval: float = DEFAULT_KEYFRAME_INTERVAL,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    ):
+        if fps <= 0:
+            raise ValueError("帧率必须大于 0 / fps must be positive")
+        self.display_num = display_num
+        self.output = output
+        self.fps = fps
+        self.tile_size = tile_size
+        self.keyframe_interval = keyframe_interval
+        self.memory_budget = memory_budget
+        self.stop_event = threading.Event()
+        self.elapsed_ms = 0
+
+    def run(self) -> RecordingWriter:
+        """录制直到 stop_event 被设置或显示器消失 / Record until stopped or the display goes away"""
+        with X11Connection(self.display_num) as conn:
+            screen = conn.screen
+            header = self._make_header(screen.width, screen.height, screen.pixel_format)
+            tick = 1.0 / self.fps
+
+            with open(self.output, "wb") as f:
+                writer = RecordingWriter(f, header, self.memory_budget)
+                try:
+                    self._capture_loop(conn, writer, tick)
+                finally:
+                    writer.close(self.elapsed_ms)
+        return writer
+
+    def _make_header(self, width: int, height: int, fmt: PixelFormat) -> RecordingHeader:
+        if fmt.bits_per_pixel != 32:
+            raise X11Error(
+                f"不支持 {fmt.bits_per_pixel} 位像素，请使用 24 位色深 / "
+                f"Unsupported pixel size, use a 24-bit display"
+            )
+        return RecordingHeader(
+            width=width, height=height, tile_size=self.tile_size, bytes_per_pixel=4,
+            msb_first=fmt.msb_first, red_mask=fmt.red_mask, green_mask=fmt.green_mask,
+            blue_mask=fmt.blue_mask, start_time=time.time(),
+        )
+
+    def _capture_loop(self, conn: X11Connection, writer: RecordingWriter, tick: float) -> None:
+        header = writer.header
+        start = time.monotonic()
+        prev: Optional[bytes] = None
+        last_key = 0.0
+        next_tick = start
+
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            try:
+                cur = conn.get_image(0, 0, header.width, header.height)
+            except (X11Error, OSError):
+                break  # 显示器已关闭 / Display went away
+            elapsed = now - start
+            timestamp_ms = int(elapsed * 1000)
+
+            # 关键帧只在画面变化时补写，静止画面不产生任何帧
+            # Periodic keyframes replace a change, so idle screens write nothing
+            if prev is None or (cur != prev and elapsed - last_key >= self.keyframe_interval):
+                writer.add_frame(KIND_KEY, timestamp_ms, 0, cur)
+                last_key = elapsed
+            elif cur != prev:
+                tiles, payload = encode_delta(prev, cur, header)
+                writer.add_frame(KIND_DELTA, timestamp_ms, tiles, payload)
+            prev = cur
+
+            next_tick += tick
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                next_tick = time.monotonic()  # 跟不上时跳过 / Skip ticks when falling behind
+                delay = 0
+            self.stop_event.wait(delay)
+        self.elapsed_ms = int((time.monotonic() - start) * 1000)
+
+
+def export_frames(
+    recording: Recording,
+    output_dir: str,
+    fps: float = DEFAULT_FPS,
+    start: float = 0.0,
+    end: Optional[float] = None,
+) -> int:
+    """按固定帧率导出 PPM 序列 / Export a PPM sequence at a fixed frame rate"""
+    if fps <= 0:
+        raise ValueError("帧率必须大于 0 / fps must be positive")
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    end = recording.duration if end is None else min(end, recording.duration)
+
+    count = 0
+    step = 0
+    shown: Optional[bytes] = None
+    frames = recording.frames(start)
+    pending = next(frames, None)
+    while start + step / fps <= end + 1e-9:
+        t = start + step / fps
+        # 推进到 t 时刻显示的帧 / Advance to the frame on screen at t
+        while pending is not None and pending[0] <= t + 1e-9:
+            shown = pending[1]
+            pending = next(frames, None)
+        if shown is not None:
+            (out / f"frame_{count:06d}.ppm").write_bytes(recording.to_ppm(shown))
+            count += 1
+        step += 1
+    return count
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    """录制进程入口 / Recorder process entry point"""
+    parser = argparse.ArgumentParser(prog="python -m devvnc.recorder")
+    parser.add_argument("--display", type=int, required=True, help="显示器编号 / Display number")
+    parser.add_argument("--output", required=True, help="输出文件 / Output file")
+    parser.add_argument("--fps", type=float, default=DEFAULT_FPS, help="帧率 / Frame rate")
+    parser.add_argument("--keyframe-interval", type=float, default=DEFAULT_KEYFRAME_INTERVAL,
+                        help="关键帧间隔秒数 / Seconds between keyframes")
+    parser.add_argument("--memory-budget", type=int, default=DEFAULT_MEMORY_BUDGET // (1024 * 1024),
+                        help="待压缩数据上限 (MiB) / Pending data limit (MiB)")
+    parsed = parser.parse_args(args)
+    if parsed.fps <= 0:
+        parser.error("--fps 必须大于 0 / --fps must be positive")
+
+    recorder = Recorder(
+        parsed.display,
+        parsed.output,
+        fps=parsed.fps,
+        keyframe_interval=parsed.keyframe_interval,
+        memory_budget=parsed.memory_budget * 1024 * 1024,
+    )
+    signal.signal(signal.SIGTERM, lambda *_: recorder.stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: recorder.stop_event.set())
+
+    try:
+        writer = recorder.run()
+    except (X11Error, OSError) as e:
+        print(f"❌ 录制失败: {e} / Recording failed", file=sys.stderr)
+        return 1
+
+    print(
+        f"Recorded {writer.frames} frames, {writer.last_ms / 1000:.1f}s, "
+        f"{writer.bytes_raw} raw bytes -> {writer.bytes_written} bytes",
+        flush=True,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
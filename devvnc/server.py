@@ -3,14 +3,20 @@ Dev VNC Server - 服务器核心实现 / Core server implementation
 """
 
 import os
-import socket
+import select
+import signal
 import subprocess
+import sys
 import time
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import TYPE_CHECKING, Any, Optional, List, Dict, Iterator
 
+from . import sysinfo
 from .config import DevVNCConfig
 
+if TYPE_CHECKING:
+    from .input import InputSession
+
 
 class DevVNCServer:
     """VNC 远程桌面服务器 / VNC remote desktop server"""
@@ -31,40 +37,140 @@ class DevVNCServer:
                 pass
         return False
     
+    def _component_patterns(self) -> Dict[str, List[str]]:
+        """各组件的进程匹配模式 / Process patterns for each component"""
+        return {
+            "xvfb": [f"Xvfb :{self.config.display_num}"],
+            "x11vnc": [f"x11vnc.*:{self.config.display_num}"],
+            # noVNC = 资源服务器 + websockify / noVNC = asset server + websockify
+            "novnc": [
+                f"devvnc.webserver.*--port {self.config.novnc_port}",
+                f"websockify.*{self.config.proxy_port}",
+            ],
+            "window_manager": [self.config.window_manager],
+        }
+    
+    def get_component_pids(self) -> Dict[str, List[int]]:
+        """获取各组件 PID，未运行为空列表 / Get component PIDs, empty when not running"""
+        patterns = self._component_patterns()
+        flat = {
+            f"{name}/{i}": pattern
+            for name, group in patterns.items()
+            for i, pattern in enumerate(group)
+        }
+        found = self._find_processes(flat)
+        
+        pids = {}
+        for name, group in patterns.items():
+            matches = [found[f"{name}/{i}"] for i in range(len(group))]
+            pids[name] = sorted(pid for m in matches for pid in m) if all(matches) else []
+        return pids
+    
     def get_status(self) -> Dict[str, bool]:
         """获取各组件状态 / Get component status"""
-        status = {
-            "xvfb": False,
-            "x11vnc": False,
-            "novnc": False,
-            "window_manager": False,
+        return {name: bool(pids) for name, pids in self.get_component_pids().items()}
+    
+    def status_report(self) -> Dict[str, Any]:
+        """状态与访问信息 (用于 JSON 输出) / Status and access info for JSON output"""
+        local_ip = self.get_local_ip()
+        return {
+            "time": time.time(),
+            "display": self.config.display,
+            "components": {
+                name: {"running": bool(pids), "pids": pids}
+                for name, pids in self.get_component_pids().items()
+            },
+            "access": {
+                "novnc_url": f"http://{local_ip}:{self.config.novnc_port}/vnc.html",
+                "vnc_address": f"{local_ip}:{self.config.vnc_port}",
+            },
         }
+    
+    def watch_status(self, interval: float = 2.0) -> Iterator[Dict[str, Any]]:
+        """推送组件状态变化 / Push component state changes
         
-    # 检查 Xvfb / Check Xvfb
-        status["xvfb"] = self._check_process(f"Xvfb :{self.config.display_num}")
-        
-    # 检查 x11vnc / Check x11vnc
-        status["x11vnc"] = self._check_process(f"x11vnc.*:{self.config.display_num}")
-        
-    # 检查 websockify (noVNC) / Check websockify (noVNC)
-        status["novnc"] = self._check_process(f"websockify.*{self.config.novnc_port}")
-        
-    # 检查窗口管理器 / Check window manager
-        status["window_manager"] = self._check_process(self.config.window_manager)
+        首先产生一个 snapshot 事件，之后每个组件变化产生一个 change 事件。
+        进程退出通过 pidfd 立即感知；有组件未运行时每 ``interval`` 秒重新扫描以发现启动。
+        Yields a snapshot event first, then one change event per component change.
+        Exits are seen immediately through pidfds; while a component is stopped,
+        /proc is rescanned every ``interval`` seconds to notice it starting.
+        """
+        current = self.get_component_pids()
+        yield {
+            "event": "snapshot",
+            "time": time.time(),
+            "components": {
+                name: {"running": bool(pids), "pids": pids}
+                for name, pids in current.items()
+            },
+        }
         
-        return status
+        while True:
+            all_running = all(current.values())
+            self._wait_for_exit(
+                [pid for pids in current.values() for pid in pids],
+                None if all_running else interval,
+                interval,
+            )
+            
+            latest = self.get_component_pids()
+            for name, pids in latest.items():
+                if pids != current.get(name):
+                    yield {
+                        "event": "change",
+                        "time": time.time(),
+                        "component": name,
+                        "running": bool(pids),
+                        "pids": pids,
+                    }
+            current = latest
     
-    def _check_process(self, pattern: str) -> bool:
-        """检查进程是否存在 / Check whether a process exists"""
+    def _wait_for_exit(self, pids: List[int], timeout: Optional[float], interval: float) -> None:
+        """等待任一进程退出或超时 / Wait until any process exits or the timeout expires"""
+        pidfd_open = getattr(os, "pidfd_open", None)
+        fds: List[int] = []
         try:
-            result = subprocess.run(
-                ["pgrep", "-f", pattern],
-                capture_output=True,
-                text=True
-            )
-            return result.returncode == 0
-        except Exception:
-            return False
+            if pidfd_open is not None:
+                for pid in pids:
+                    try:
+                        fds.append(pidfd_open(pid))
+                    except ProcessLookupError:
+                        return  # 已退出 / Already gone
+                    except OSError:
+                        fds = []  # 内核不支持 pidfd / Kernel without pidfd
+                        break
+            
+            if not fds:
+                time.sleep(interval if timeout is None else timeout)
+                return
+            
+            poller = select.poll()
+            for fd in fds:
+                poller.register(fd, select.POLLIN)
+            poller.poll(None if timeout is None else int(timeout * 1000))
+        finally:
+            for fd in fds:
+                os.close(fd)
+    
+    def _find_processes(self, patterns: Dict[str, str]) -> Dict[str, List[int]]:
+        """一次扫描 /proc 匹配所有模式 / Match all patterns with a single /proc scan"""
+        processes = sysinfo.scan_processes()
+        if processes is not None:
+            return sysinfo.match_processes(patterns, processes)
+        
+        # 没有 /proc 时退回 pgrep / Fall back to pgrep without /proc
+        found = {}
+        for name, pattern in patterns.items():
+            try:
+                result = subprocess.run(
+                    ["pgrep", "-f", pattern],
+                    capture_output=True,
+                    text=True
+                )
+                found[name] = [int(pid) for pid in result.stdout.split() if pid.isdigit()]
+            except Exception:
+                found[name] = []
+        return found
     
     def _kill_process(self, pattern: str) -> None:
         """终止匹配的进程 / Terminate matching processes"""
@@ -129,6 +235,10 @@ class DevVNCServer:
         """停止服务 / Stop the service"""
         print("\n🛑 停止远程桌面服务... / Stopping remote desktop service...")
         
+        # 先结束录制，保证文件写入索引 / Finish recording first so the file gets its index
+        if self._recorder_pid():
+            self.stop_recording()
+        
         self._cleanup()
         
         # 清理 PID 文件 / Clean PID files
@@ -148,6 +258,8 @@ class DevVNCServer:
         """清理所有相关进程 / Clean all related processes"""
         self._kill_process(f"Xvfb :{self.config.display_num}")
         self._kill_process(f"x11vnc.*:{self.config.display_num}")
+        self._kill_process(f"devvnc.webserver.*--port {self.config.novnc_port}")
+        self._kill_process(f"websockify.*{self.config.proxy_port}")
         self._kill_process(f"websockify.*{self.config.novnc_port}")
         self._kill_process(self.config.window_manager)
     
@@ -263,20 +375,117 @@ class DevVNCServer:
         
         log_file = self.config.log_dir / "websockify.log"
         
+        # websockify 只负责 WebSocket，静态资源由 devvnc 自己提供
+        # websockify only handles WebSocket; devvnc serves the static assets itself
         with open(log_file, "w") as f:
-            proc = subprocess.Popen(
+            proxy = subprocess.Popen(
                 [
                     "websockify",
-                    f"--web={novnc_path}",
-                    str(self.config.novnc_port),
+                    f"localhost:{self.config.proxy_port}",
                     f"localhost:{self.config.vnc_port}"
                 ],
                 stdout=f,
                 stderr=f
             )
+            self._processes["websockify"] = proxy
+            self._save_pid("websockify", proxy.pid)
+            
+            proc = subprocess.Popen(
+                [
+                    sys.executable, "-m", "devvnc.webserver",
+                    f"--web={novnc_path}",
+                    f"--proxy-port={self.config.proxy_port}",
+                    "--port", str(self.config.novnc_port)
+                ],
+                stdout=f,
+                stderr=f
+            )
             self._processes["novnc"] = proc
             self._save_pid("novnc", proc.pid)
     
+    def _recorder_pid(self) -> Optional[int]:
+        """正在运行的录制进程 PID / PID of the running recorder, if any
+
+        PID 可能已被其他进程复用，因此核对命令行；过期的 PID 文件会被删除。
+        The PID may have been reused, so the command line is checked; a stale
+        PID file is removed.
+        """
+        pid_file = self.config.run_dir / "recorder.pid"
+        try:
+            pid = int(pid_file.read_text().strip())
+        except (OSError, ValueError):
+            return None
+        
+        cmdline = sysinfo.process_cmdline(pid)
+        if not cmdline or "devvnc.recorder" not in cmdline:
+            pid_file.unlink(missing_ok=True)
+            return None
+        return pid
+    
+    def start_recording(self, output: Optional[str] = None, fps: float = 5.0) -> bool:
+        """开始录制显示器 / Start recording the display"""
+        if self._recorder_pid():
+            print("⚠️  已在录制 / Already recording")
+            return False
+        
+        self.config.ensure_dirs()
+        self.config.record_dir.mkdir(parents=True, exist_ok=True)
+        path = Path(output) if output else (
+            self.config.record_dir / f"{time.strftime('%Y%m%d-%H%M%S')}.dvr"
+        )
+        log_file = self.config.log_dir / "recorder.log"
+        
+        with open(log_file, "w") as f:
+            proc = subprocess.Popen(
+                [
+                    sys.executable, "-m", "devvnc.recorder",
+                    "--display", str(self.config.display_num),
+                    "--output", str(path),
+                    "--fps", str(fps)
+                ],
+                stdout=f,
+                stderr=f,
+                # 独立会话：关闭终端 (SIGHUP) 不会中断录制
+                # New session so closing the terminal (SIGHUP) doesn't stop recording
+                start_new_session=True
+            )
+        time.sleep(0.5)
+        
+        if proc.poll() is not None:
+            print(f"❌ 录制启动失败 / Recording failed to start:\n{log_file.read_text().strip()}")
+            return False
+        
+        self._processes["recorder"] = proc
+        self._save_pid("recorder", proc.pid)
+        print(f"⏺️  正在录制 / Recording to: {path}")
+        return True
+    
+    def stop_recording(self, timeout: float = 30.0) -> bool:
+        """停止录制并等待文件写完 / Stop recording and wait for the file to be finalized"""
+        pid = self._recorder_pid()
+        if not pid:
+            print("⚠️  未在录制 / Not recording")
+            return False
+        
+        os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                break
+            time.sleep(0.1)
+        else:
+            print("❌ 录制进程未退出 / Recorder did not exit")
+            return False
+        
+        (self.config.run_dir / "recorder.pid").unlink(missing_ok=True)
+        
+        log_file = self.config.log_dir / "recorder.log"
+        summary = log_file.read_text().strip().splitlines() if log_file.exists() else []
+        print(f"⏹️  录制已停止 / Recording stopped{': ' + summary[-1] if summary else ''}")
+        return True
+    
     def _save_pid(self, name: str, pid: int) -> None:
         """保存 PID / Save PID"""
         pid_file = self.config.run_dir / f"{name}.pid"
@@ -284,14 +493,7 @@ class DevVNCServer:
     
     def get_local_ip(self) -> str:
         """获取本机 IP 地址 / Get local IP address"""
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
-        except Exception:
-            return "localhost"
+        return sysinfo.primary_ip() or "localhost"
     
     def show_info(self) -> None:
         """显示访问信息 / Show access information"""
@@ -365,6 +567,17 @@ class DevVNCServer:
                 print("\n=== noVNC 日志 / noVNC Logs ===")
                 print(novnc_log.read_text()[-5000:])
     
+    def input(self) -> "InputSession":
+        """打开批量输入会话 (XTEST) / Open a batched input session (XTEST)
+        
+        比逐个调用 xdotool 快得多：一个持久连接，事件在 flush() 时一次写出。
+        Much faster than one xdotool call per action: one persistent connection,
+        with events written in one go on flush().
+        """
+        from .input import InputSession
+        
+        return InputSession(self.config.display_num)
+    
     def run_command(self, command: List[str]) -> int:
         """在 VNC 环境中运行命令 / Run command in VNC environment"""
         if not self.is_running():
@@ -0,0 +1,145 @@
+"""
+Dev VNC Server - 系统信息 (/proc) / System information read from /proc
+
+不 fork、不访问网络：进程扫描读 /proc/<pid>/cmdline，网卡信息读
+/proc/net/route 和 /proc/net/dev，地址通过 SIOCGIFADDR ioctl 获取。
+No forks and no network traffic: processes come from /proc/<pid>/cmdline,
+interfaces from /proc/net/route and /proc/net/dev, and addresses from the
+SIOCGIFADDR ioctl.
+"""
+
+import os
+import re
+import socket
+import struct
+from typing import Dict, List, Optional, Tuple
+
+PROC = "/proc"
+
+# <linux/sockios.h>
+SIOCGIFADDR = 0x8915
+
+
+def scan_processes() -> Optional[List[Tuple[int, str]]]:
+    """列出所有进程的 (pid, 命令行) / List (pid, command line) for all processes
+
+    命令行参数以空格连接，与 ``pgrep -f`` 一致；/proc 不可用时返回 None。
+    Arguments are joined with spaces like ``pgrep -f``; returns None without /proc.
+    """
+    try:
+        entries = os.listdir(PROC)
+    except OSError:
+        return None
+
+    own_pid = os.getpid()
+    processes = []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        if pid == own_pid:
+            continue
+        cmdline = process_cmdline(pid)
+        if cmdline:
+            processes.append((pid, cmdline))
+    return processes
+
+
+def process_cmdline(pid: int) -> Optional[str]:
+    """读取单个进程的命令行 / Command line of one process
+
+    进程不存在或无权限时返回 None；内核线程和僵尸进程返回空串。
+    Returns None if the process is gone or not readable, and an empty string
+    for kernel threads and zombies.
+    """
+    try:
+        with open(f"{PROC}/{pid}/cmdline", "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    return raw.rstrip(b"\0").replace(b"\0", b" ").decode("utf-8", "replace")
+
+
+def match_processes(
+    patterns: Dict[str, str],
+    processes: List[Tuple[int, str]],
+) -> Dict[str, List[int]]:
+    """按正则匹配进程，一次扫描匹配全部模式 / Match all patterns against one scan"""
+    compiled = {name: re.compile(pattern) for name, pattern in patterns.items()}
+    matches: Dict[str, List[int]] = {name: [] for name in patterns}
+    for pid, cmdline in processes:
+        for name, regex in compiled.items():
+            if regex.search(cmdline):
+                matches[name].append(pid)
+    for pids in matches.values():
+        pids.sort()
+    return matches
+
+
+def _default_route_interface() -> Optional[str]:
+    """默认路由所在网卡 / Interface carrying the default route"""
+    try:
+        with open(f"{PROC}/net/route") as f:
+            next(f, None)  # 表头 / Header
+            for line in f:
+                fields = line.split()
+                if len(fields) > 1 and fields[1] == "00000000":
+                    return fields[0]
+    except OSError:
+        pass
+    return None
+
+
+def _interface_names() -> List[str]:
+    """读取 /proc/net/dev 中的网卡名 / Interface names from /proc/net/dev"""
+    try:
+        with open(f"{PROC}/net/dev") as f:
+            lines = f.readlines()[2:]
+    except OSError:
+        return []
+    return [line.split(":", 1)[0].strip() for line in lines if ":" in line]
+
+
+def _interface_address(sock: socket.socket, name: str) -> Optional[str]:
+    import fcntl
+
+    try:
+        packed = fcntl.ioctl(
+            sock.fileno(), SIOCGIFADDR, struct.pack("256s", name[:15].encode())
+        )
+    except OSError:
+        return None  # 无 IPv4 地址 / No IPv4 address
+    return socket.inet_ntoa(packed[20:24])
+
+
+def get_interfaces() -> Dict[str, str]:
+    """枚举网卡 IPv4 地址 / Enumerate IPv4 addresses
+
+    每次调用只读一次 /proc/net/dev 并为每个网卡做一次 ioctl，比读写缓存文件还便宜。
+    Each call reads /proc/net/dev once plus one ioctl per interface, which is
+    cheaper than reading and validating a cache file would be.
+    """
+    interfaces = {}
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for name in _interface_names():
+                address = _interface_address(sock, name)
+                if address:
+                    interfaces[name] = address
+    except (OSError, ImportError):
+        pass
+    return interfaces
+
+
+def primary_ip() -> Optional[str]:
+    """本机对外 IP：默认路由网卡优先 / Outward-facing IP, default-route interface first"""
+    interfaces = get_interfaces()
+
+    default = _default_route_interface()
+    if default and default in interfaces:
+        return interfaces[default]
+
+    for name, address in interfaces.items():
+        if name != "lo" and not address.startswith("127."):
+            return address
+    return None
@@ -0,0 +1,388 @@
+"""
+Dev VNC Server - noVNC 静态资源服务器 / noVNC static asset server
+
+启动时为 noVNC 目录建立索引，预压缩 (gzip / Brotli) 并缓存资源，
+返回强 ETag、Cache-Control 和 304；WebSocket 请求转发给 websockify。
+Indexes the noVNC directory at startup, precompresses (gzip / Brotli) and
+caches assets, serves strong ETags, Cache-Control and 304s, and forwards
+WebSocket upgrades to websockify.
+"""
+
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import select
+import socket
+import sys
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # 可选依赖 / Optional dependency
+    brotli = None
+
+
+# 值得压缩的类型 / Content types worth compressing
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+)
+
+# noVNC 文件名不带版本号，所有资源都按 ETag 重新验证
+# noVNC file names carry no version, so every asset revalidates against its ETag
+CACHE_CONTROL = "no-cache"
+
+# 后台预压缩用最高 Brotli 质量，请求线程中重新加载时用快速质量
+# Background precompression uses the best Brotli quality, reloads in request threads a fast one
+BROTLI_QUALITY = 11
+BROTLI_RELOAD_QUALITY = 4
+
+# 请求等待索引建立的最长秒数 / Longest a request waits for the index to be built
+INDEX_WAIT_TIMEOUT = 30.0
+
+# 小于此大小的文件不压缩 / Files smaller than this are not compressed
+MIN_COMPRESS_SIZE = 256
+
+# 读写转发缓冲区大小 / Relay buffer size
+RELAY_BUFFER_SIZE = 64 * 1024
+
+mimetypes.add_type("application/javascript", ".js")
+mimetypes.add_type("application/javascript", ".mjs")
+
+
+@dataclass
+class Asset:
+    """已缓存的静态资源 / Cached static asset"""
+
+    path: str
+    mtime_ns: int
+    content_type: str
+    etag: str
+    body: bytes
+    gzip_body: Optional[bytes] = None
+    brotli_body: Optional[bytes] = None
+
+    def variant(self, accept_encoding: str) -> Tuple[str, str, bytes]:
+        """选择最佳编码 / Pick the best encoding for Accept-Encoding
+
+        返回 (编码, ETag, 内容) / Returns (encoding, ETag, body)
+        """
+        accepted = _parse_accept_encoding(accept_encoding)
+        if self.brotli_body is not None and "br" in accepted:
+            return "br", f'"{self.etag}-br"', self.brotli_body
+        if self.gzip_body is not None and "gzip" in accepted:
+            return "gzip", f'"{self.etag}-gz"', self.gzip_body
+        return "identity", f'"{self.etag}"', self.body
+
+
+def _parse_accept_encoding(header: str) -> List[str]:
+    """解析 Accept-Encoding (忽略 q=0) / Parse Accept-Encoding (q=0 excluded)"""
+    accepted = []
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = params.strip().replace(" ", "")
+        if q in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.append(name)
+    return accepted
+
+
+def _is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _brotli(body: bytes, quality: int) -> Optional[bytes]:
+    br = brotli.compress(body, quality=quality)
+    return br if len(br) < len(body) else None
+
+
+def load_asset(path: str, brotli_quality: Optional[int] = BROTLI_RELOAD_QUALITY) -> Asset:
+    """读取并预压缩单个文件 / Read and precompress a single file
+
+    ``brotli_quality`` 为 None 时跳过 Brotli。
+    Brotli is skipped when ``brotli_quality`` is None.
+    """
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        body = f.read()
+
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type == "application/javascript":
+        content_type += "; charset=utf-8"
+
+    asset = Asset(
+        path=path,
+        mtime_ns=st.st_mtime_ns,
+        content_type=content_type,
+        etag=hashlib.sha1(body).hexdigest()[:20],
+        body=body,
+    )
+
+    if _is_compressible(content_type) and len(body) >= MIN_COMPRESS_SIZE:
+        gz = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(gz) < len(body):
+            asset.gzip_body = gz
+        if brotli is not None and brotli_quality is not None:
+            asset.brotli_body = _brotli(body, brotli_quality)
+
+    return asset
+
+
+class AssetCache:
+    """noVNC 资源索引与缓存 (按 mtime 失效) / noVNC asset index and cache keyed by mtime"""
+
+    def __init__(self, root: str):
+        self.root = os.path.realpath(root)
+        self._index: Dict[str, str] = {}
+        self._assets: Dict[str, Asset] = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def _walk(self) -> Dict[str, str]:
+        """URL 路径 -> 文件路径，跳过符号链接循环 / URL path -> file path, skipping symlink loops"""
+        index = {}
+        ancestors = {self.root: frozenset([self.root])}
+        for dirpath, dirnames, filenames in os.walk(self.root, followlinks=True):
+            chain = ancestors.pop(dirpath)
+            kept = []
+            for name in dirnames:
+                real = os.path.realpath(os.path.join(dirpath, name))
+                if real in chain:
+                    continue  # 指向祖先目录的链接 / Link back to an ancestor
+                ancestors[os.path.join(dirpath, name)] = chain | {real}
+                kept.append(name)
+            dirnames[:] = kept
+
+            for name in filenames:
+                full = os.path.join(dirpath, name)
+                rel = os.path.relpath(full, self.root).replace(os.sep, "/")
+                index["/" + rel] = full
+        return index
+
+    def build(self) -> int:
+        """建立索引并预压缩所有资源 / Index the directory and precompress all assets
+
+        先用 gzip 建立索引并开始响应请求，再逐个补上高质量 Brotli。
+        The index is published with gzip first so requests can be served,
+        then high-quality Brotli is added asset by asset.
+        """
+        assets = {}
+        try:
+            index = self._walk()
+            for url_path, full in index.items():
+                try:
+                    assets[url_path] = load_asset(full, brotli_quality=None)
+                except OSError:
+                    continue
+
+            with self._lock:
+                self._index = {k: v for k, v in index.items() if k in assets}
+                self._assets = assets
+        finally:
+            # 失败时也不让请求一直等待 / Never leave requests waiting, even on failure
+            self._ready.set()
+
+        if brotli is not None:
+            for asset in assets.values():
+                if _is_compressible(asset.content_type) and len(asset.body) >= MIN_COMPRESS_SIZE:
+                    asset.brotli_body = _brotli(asset.body, BROTLI_QUALITY)
+        return len(assets)
+
+    def build_in_background(self) -> threading.Thread:
+        """在后台线程中建立索引 / Build the index on a background thread"""
+
+        def run() -> None:
+            count = self.build()
+            sys.stderr.write(
+                f"Indexed {count} assets from {self.root} "
+                f"(brotli: {'yes' if brotli else 'no'})\n"
+            )
+
+        thread = threading.Thread(target=run, name="devvnc-asset-index", daemon=True)
+        thread.start()
+        return thread
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, url_path: str) -> Optional[Asset]:
+        """获取资源，文件变化时重新加载 / Get an asset, reloading it if the file changed"""
+        self._ready.wait(INDEX_WAIT_TIMEOUT)
+        full = self._index.get(url_path)
+        if full is None:
+            return None
+
+        try:
+            mtime_ns = os.stat(full).st_mtime_ns
+        except OSError:
+            return None
+
+        asset = self._assets.get(url_path)
+        if asset is not None and asset.mtime_ns == mtime_ns:
+            return asset
+
+        try:
+            asset = load_asset(full)
+        except OSError:
+            return None
+        with self._lock:
+            self._assets[url_path] = asset
+        return asset
+
+
+class NoVNCRequestHandler(BaseHTTPRequestHandler):
+    """静态资源 + WebSocket 转发 / Static assets plus WebSocket forwarding"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "devvnc"
+
+    # 由 make_server() 设置 / Set by make_server()
+    cache: AssetCache
+    proxy_address: Tuple[str, int]
+    index_page: str = "/vnc.html"
+
+    def do_GET(self) -> None:
+        if self.headers.get("Upgrade", "").lower() == "websocket":
+            self._relay_websocket()
+            return
+        self._serve_asset(send_body=True)
+
+    def do_HEAD(self) -> None:
+        self._serve_asset(send_body=False)
+
+    def _serve_asset(self, send_body: bool) -> None:
+        url_path = unquote(urlsplit(self.path).path)
+
+        if url_path == "/":
+            self.send_response(302)
+            self.send_header("Location", self.index_page)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        asset = self.cache.get(url_path)
+        if asset is None:
+            self.send_error(404)
+            return
+
+        encoding, etag, body = asset.variant(self.headers.get("Accept-Encoding", ""))
+        cache_control = CACHE_CONTROL
+
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match and (
+            if_none_match.strip() == "*"
+            or etag in [t.strip() for t in if_none_match.split(",")]
+        ):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", cache_control)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", asset.content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding != "identity":
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _relay_websocket(self) -> None:
+        """把 WebSocket 连接原样转发给 websockify / Relay the WebSocket connection to websockify"""
+        try:
+            upstream = socket.create_connection(self.proxy_address, timeout=5)
+        except OSError:
+            self.send_error(502, "VNC proxy unavailable")
+            return
+
+        upstream.settimeout(None)
+        # 客户端在收到 101 之前不会发送帧，rfile 中没有残留数据
+        # Clients send no frames before the 101, so rfile holds no leftover bytes
+        head = f"{self.requestline}\r\n"
+        head += "".join(f"{k}: {v}\r\n" for k, v in self.headers.items()) + "\r\n"
+
+        try:
+            upstream.sendall(head.encode("latin-1"))
+            _splice(self.connection, upstream)
+        finally:
+            upstream.close()
+            self.close_connection = True
+
+    def log_message(self, format: str, *args) -> None:
+        sys.stderr.write(f"{self.address_string()} - {format % args}\n")
+
+
+def _splice(a: socket.socket, b: socket.socket) -> None:
+    """双向转发直到任一端关闭 / Relay bytes both ways until either side closes"""
+    peers = {a: b, b: a}
+    while True:
+        readable, _, _ = select.select(list(peers), [], [])
+        for sock in readable:
+            try:
+                data = sock.recv(RELAY_BUFFER_SIZE)
+            except OSError:
+                return
+            if not data:
+                return
+            peers[sock].sendall(data)
+
+
+def make_server(
+    web_root: str,
+    port: int,
+    proxy_port: int,
+    host: str = "",
+    proxy_host: str = "localhost",
+) -> ThreadingHTTPServer:
+    """创建服务器，端口绑定后在后台建立资源缓存 / Create the server; the asset cache builds after binding"""
+    cache = AssetCache(web_root)
+    handler = type(
+        "BoundNoVNCRequestHandler",
+        (NoVNCRequestHandler,),
+        {"cache": cache, "proxy_address": (proxy_host, proxy_port)},
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    cache.build_in_background()
+    return server
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    """入口 / Entry point"""
+    parser = argparse.ArgumentParser(prog="python -m devvnc.webserver")
+    parser.add_argument("--web", required=True, help="noVNC 目录 / noVNC directory")
+    parser.add_argument("--port", type=int, required=True, help="监听端口 / Listen port")
+    parser.add_argument("--proxy-port", type=int, required=True, help="websockify 端口 / websockify port")
+    parser.add_argument("--host", default="", help="监听地址 / Listen address")
+    parsed = parser.parse_args(args)
+
+    server = make_server(parsed.web, parsed.port, parsed.proxy_port, host=parsed.host)
+    print(f"Serving {parsed.web} on port {parsed.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+"""
+Dev VNC Server - 轻量 X11 协议客户端 / Minimal X11 protocol client
+
+直接通过 /tmp/.X11-unix/X<n> 与 X 服务器通信，不依赖 Xlib 或外部命令。
+Talks to the X server directly over /tmp/.X11-unix/X<n>, without Xlib or
+external commands.
+"""
+
+import os
+import socket
+import struct
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+X11_SOCKET_DIR = "/tmp/.X11-unix"
+
+# 核心协议操作码 / Core protocol opcodes
+OP_GET_INPUT_FOCUS = 43
+OP_GET_IMAGE = 73
+OP_QUERY_EXTENSION = 98
+OP_CHANGE_KEYBOARD_MAPPING = 100
+OP_GET_KEYBOARD_MAPPING = 101
+
+# 图像格式 / Image formats
+Z_PIXMAP = 2
+
+# Xauthority 地址族 / Xauthority address families
+FAMILY_LOCAL = 256
+FAMILY_WILD = 65535
+
+AUTH_NAME = b"MIT-MAGIC-COOKIE-1"
+
+
+class X11Error(RuntimeError):
+    """X11 协议错误 / X11 protocol error"""
+
+    def __init__(self, message: str, code: int = 0, major: int = 0, minor: int = 0):
+        super().__init__(message)
+        self.code = code
+        self.major = major
+        self.minor = minor
+
+
+@dataclass
+class PixelFormat:
+    """根窗口像素格式 / Root window pixel format"""
+
+    depth: int
+    bits_per_pixel: int
+    scanline_pad: int
+    red_mask: int = 0
+    green_mask: int = 0
+    blue_mask: int = 0
+    msb_first: bool = False
+
+
+@dataclass
+class ScreenInfo:
+    """连接建立后的屏幕信息 / Screen information from the setup reply"""
+
+    root: int
+    width: int
+    height: int
+    root_visual: int
+    pixel_format: PixelFormat
+    min_keycode: int
+    max_keycode: int
+    max_request_length: int
+    pixmap_formats: Dict[int, Tuple[int, int]] = field(default_factory=dict)
+
+
+def _pad(n: int) -> int:
+    return (4 - n % 4) % 4
+
+
+def read_xauthority(display_num: int) -> Tuple[bytes, bytes]:
+    """从 Xauthority 查找 MIT-MAGIC-COOKIE-1 / Look up a MIT-MAGIC-COOKIE-1 entry
+
+    未找到时返回空凭据 (Xvfb 默认不启用认证)。
+    Returns empty credentials when nothing matches (Xvfb runs without auth by default).
+    """
+    path = os.environ.get("XAUTHORITY") or str(Path.home() / ".Xauthority")
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return b"", b""
+
+    hostname = socket.gethostname().encode()
+    number = str(display_num).encode()
+    offset = 0
+
+    def counted() -> bytes:
+        nonlocal offset
+        (length,) = struct.unpack_from(">H", data, offset)
+        value = data[offset + 2:offset + 2 + length]
+        offset += 2 + length
+        return value
+
+    try:
+        while offset < len(data):
+            (family,) = struct.unpack_from(">H", data, offset)
+            offset += 2
+            address, entry_number, name, cookie = counted(), counted(), counted(), counted()
+            if name != AUTH_NAME or entry_number not in (number, b""):
+                continue
+            if family == FAMILY_WILD or (family == FAMILY_LOCAL and address == hostname):
+                return name, cookie
+    except struct.error:
+        pass  # 文件截断 / Truncated file
+    return b"", b""
+
+
+class X11Connection:
+    """X11 连接 / X11 connection
+
+    只实现 devvnc 需要的少量请求；请求可以先缓冲再一次性写出。
+    Implements only the few requests devvnc needs; requests may be buffered
+    and written out in one go.
+    """
+
+    def __init__(self, display_num: int, timeout: Optional[float] = 10.0):
+        self.display_num = display_num
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._seq = 0
+        self._flushed_seq = 0
+        self._out = bytearray()
+        self._in = bytearray()
+
+        try:
+            self._sock.connect(f"{X11_SOCKET_DIR}/X{display_num}")
+            self.screen = self._handshake()
+        except (OSError, struct.error) as e:
+            self._sock.close()
+            raise X11Error(f"无法连接到显示器 :{display_num}: {e} / Cannot connect to display") from e
+
+    def __enter__(self) -> "X11Connection":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """关闭连接 / Close the connection"""
+        self._sock.close()
+
+    # 底层读写 / Low-level I/O
+
+    def _recv_exact(self, n: int) -> bytes:
+        while len(self._in) < n:
+            try:
+                chunk = self._sock.recv(max(n - len(self._in), 65536))
+            except OSError as e:  # 包括超时 / Timeouts included
+                raise X11Error(f"读取 X 服务器失败: {e} / X server read failed") from e
+            if not chunk:
+                raise X11Error("X 服务器关闭了连接 / X server closed the connection")
+            self._in += chunk
+        data = bytes(self._in[:n])
+        del self._in[:n]
+        return data
+
+    def _handshake(self) -> ScreenInfo:
+        auth_name, auth_data = read_xauthority(self.display_num)
+        self._sock.sendall(
+            struct.pack("<BxHHHH2x", 0x6C, 11, 0, len(auth_name), len(auth_data))
+            + auth_name + b"\0" * _pad(len(auth_name))
+            + auth_data + b"\0" * _pad(len(auth_data))
+        )
+
+        status, reason_len, _, _, length = struct.unpack("<BBHHH", self._recv_exact(8))
+        body = self._recv_exact(length * 4)
+        if status != 1:
+            reason = body[:reason_len] if status == 0 else body
+            raise X11Error(
+                f"X11 连接被拒绝 / X11 connection refused: "
+                f"{reason.decode('latin-1').strip(chr(0)).strip()}"
+            )
+
+        (
+            _release, _id_base, _id_mask, _motion, vendor_len, max_request_length,
+            num_screens, num_formats, image_byte_order, _bit_order, _unit, _pad_bits,
+            min_keycode, max_keycode,
+        ) = struct.unpack_from("<IIIIHHBBBBBBBB4x", body, 0)
+
+        offset = 32 + vendor_len + _pad(vendor_len)
+        pixmap_formats = {}
+        for _ in range(num_formats):
+            depth, bpp, scanline_pad = struct.unpack_from("<BBB5x", body, offset)
+            pixmap_formats[depth] = (bpp, scanline_pad)
+            offset += 8
+
+        if num_screens < 1:
+            raise X11Error("X 服务器没有屏幕 / X server has no screens")
+
+        (
+            root, _colormap, _white, _black, _masks, width, height, _wmm, _hmm,
+            _min_maps, _max_maps, root_visual, _backing, _save_unders, root_depth,
+            num_depths,
+        ) = struct.unpack_from("<IIIIIHHHHHHIBBBB", body, offset)
+        offset += 40
+
+        masks = (0, 0, 0)
+        for _ in range(num_depths):
+            _depth, num_visuals = struct.unpack_from("<BxH4x", body, offset)
+            offset += 8
+            for _ in range(num_visuals):
+                visual_id, _cls, _bits, _entries, red, green, blue = struct.unpack_from(
+                    "<IBBHIII4x", body, offset
+                )
+                if visual_id == root_visual:
+                    masks = (red, green, blue)
+                offset += 24
+
+        bpp, scanline_pad = pixmap_formats.get(root_depth, (root_depth, 32))
+        return ScreenInfo(
+            root=root,
+            width=width,
+            height=height,
+            root_visual=root_visual,
+            pixel_format=PixelFormat(
+                depth=root_depth,
+                bits_per_pixel=bpp,
+                scanline_pad=scanline_pad,
+                red_mask=masks[0],
+                green_mask=masks[1],
+                blue_mask=masks[2],
+                msb_first=image_byte_order == 1,
+            ),
+            min_keycode=min_keycode,
+            max_keycode=max_keycode,
+            max_request_length=max_request_length,
+            pixmap_formats=pixmap_formats,
+        )
+
+    # 请求 / Requests
+
+    def queue_request(self, data: bytes) -> int:
+        """缓冲一个请求，返回序列号 / Buffer a request and return its sequence number"""
+        self._out += data
+        self._seq += 1
+        return self._seq
+
+    def flush(self) -> int:
+        """写出所有缓冲请求，返回字节数 / Write out buffered requests, return byte count"""
+        n = len(self._out)
+        if n:
+            try:
+                self._sock.sendall(self._out)
+            except OSError as e:
+                raise X11Error(f"写入 X 服务器失败: {e} / X server write failed") from e
+            self._out.clear()
+        self._flushed_seq = self._seq
+        return n
+
+    def discard(self) -> int:
+        """丢弃尚未写出的请求，返回丢弃的请求数 / Drop unwritten requests, return how many"""
+        dropped = self._seq - self._flushed_seq
+        self._seq = self._flushed_seq
+        self._out.clear()
+        return dropped
+
+    @contextmanager
+    def extended_timeout(self, seconds: float) -> Iterator[None]:
+        """临时延长超时 / Temporarily extend the socket timeout
+
+        用于服务器会故意等待的请求，如带延迟的 XTEST 事件。
+        For requests the server deliberately waits on, such as delayed XTEST
+        events.
+        """
+        timeout = self._sock.gettimeout()
+        if timeout is None or seconds <= 0:
+            yield
+            return
+        self._sock.settimeout(timeout + seconds)
+        try:
+            yield
+        finally:
+            self._sock.settimeout(timeout)
+
+    def read_reply(self, seq: int) -> bytes:
+        """读取指定请求的回复 (含 32 字节头) / Read the reply to a request (with 32-byte header)
+
+        期间收到的事件被丢弃；错误以 X11Error 抛出。
+        Events received meanwhile are discarded; errors raise X11Error.
+        """
+        self.flush()
+        while True:
+            head = self._recv_exact(32)
+            kind = head[0]
+            if kind == 0:
+                code, err_seq, value, minor, major = struct.unpack_from("<xBHIHB", head)
+                raise X11Error(
+                    f"X11 错误 {code} (请求 {major}.{minor}, 值 {value:#x}) / X11 error",
+                    code=code, major=major, minor=minor,
+                )
+            if kind == 1:
+                reply_seq, extra = struct.unpack_from("<HI", head, 2)
+                body = self._recv_exact(extra * 4) if extra else b""
+                if reply_seq == seq & 0xFFFF:
+                    return head + body
+            # 其他为事件，忽略 / Anything else is an event; ignore it
+
+    def get_image(self, x: int, y: int, width: int, height: int) -> bytes:
+        """读取根窗口区域的 ZPixmap 像素 / Read root window pixels as a ZPixmap"""
+        seq = self.queue_request(struct.pack(
+            "<BBHIhhHHI", OP_GET_IMAGE, Z_PIXMAP, 5,
+            self.screen.root, x, y, width, height, 0xFFFFFFFF,
+        ))
+        return self.read_reply(seq)[32:]
+
+    def query_extension(self, name: str) -> Optional[int]:
+        """查询扩展的主操作码，不存在时返回 None / Major opcode of an extension, None if absent"""
+        encoded = name.encode("latin-1")
+        seq = self.queue_request(
+            struct.pack("<BxHH2x", OP_QUERY_EXTENSION, 2 + (len(encoded) + _pad(len(encoded))) // 4,
+                        len(encoded))
+            + encoded + b"\0" * _pad(len(encoded))
+        )
+        present, major_opcode = struct.unpack_from("<BB", self.read_reply(seq), 8)
+        return major_opcode if present else None
+
+    def get_keyboard_mapping(self) -> List[List[int]]:
+        """读取键盘映射：每个键码一行 keysym / Keyboard mapping: one keysym row per keycode
+
+        第 0 行对应 ``min_keycode``。
+        Row 0 corresponds to ``min_keycode``.
+        """
+        first = self.screen.min_keycode
+        count = self.screen.max_keycode - first + 1
+        seq = self.queue_request(
+            struct.pack("<BxHBB2x", OP_GET_KEYBOARD_MAPPING, 2, first, count)
+        )
+        reply = self.read_reply(seq)
+        per_keycode = reply[1]
+        keysyms = struct.unpack_from(f"<{count * per_keycode}I", reply, 32)
+        return [list(keysyms[i:i + per_keycode]) for i in range(0, len(keysyms), per_keycode)]
+
+    def change_keyboard_mapping(self, first_keycode: int, rows: List[List[int]]) -> int:
+        """缓冲 ChangeKeyboardMapping 请求 / Buffer a ChangeKeyboardMapping request"""
+        per_keycode = len(rows[0])
+        keysyms = [keysym for row in rows for keysym in row]
+        return self.queue_request(
+            struct.pack("<BBHBB2x", OP_CHANGE_KEYBOARD_MAPPING, len(rows), 2 + len(keysyms),
+                        first_keycode, per_keycode)
+            + struct.pack(f"<{len(keysyms)}I", *keysyms)
+        )
+
+    def sync(self) -> None:
+        """往返一次，确保之前的请求都已处理 / Round-trip so all earlier requests are processed"""
+        self.read_reply(self.queue_request(struct.pack("<BxH", OP_GET_INPUT_FOCUS, 1)))
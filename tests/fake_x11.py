@@ -0,0 +1,159 @@
+"""
+测试用的假 X 服务器 / Fake X server for tests
+
+实现连接建立、GetImage、QueryExtension (XTEST)、Get/ChangeKeyboardMapping
+和 GetInputFocus，其余请求记录在 ``requests`` 中，同步往返的序列号记录在
+``syncs`` 中。
+Implements connection setup, GetImage, QueryExtension (XTEST),
+Get/ChangeKeyboardMapping and GetInputFocus; every other request (and
+ChangeKeyboardMapping) is recorded in ``requests`` and sync round trips in
+``syncs``.
+"""
+
+import os
+import socket
+import struct
+import threading
+import time
+from typing import List, Tuple
+
+ROOT = 0x100
+VISUAL = 0x21
+XTEST_OPCODE = 140
+MIN_KEYCODE, MAX_KEYCODE = 8, 255
+
+# 键码 -> (无修饰, Shift) keysym / Keycode -> (plain, Shift) keysyms
+KEYMAP = {
+    10: (ord("1"), ord("!")),
+    36: (0xFF0D, 0),       # Return
+    37: (0xFFE3, 0),       # Control_L
+    38: (ord("a"), ord("A")),
+    50: (0xFFE1, 0),       # Shift_L
+    54: (ord("c"), 0),     # 单列字母键 / Single-column letter key
+    65: (ord(" "), 0),
+}
+
+
+class FakeXServer:
+    """单连接假 X 服务器 / Single-connection fake X server"""
+
+    def __init__(self, socket_dir: str, display_num: int, width: int = 80, height: int = 40):
+        self.width = width
+        self.height = height
+        self.framebuffer = bytearray(width * height * 4)
+        self.requests: List[Tuple[int, bytes]] = []
+        self.syncs: List[int] = []
+        self.keymap = dict(KEYMAP)
+        self._lock = threading.Lock()
+
+        os.makedirs(socket_dir, exist_ok=True)
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(os.path.join(socket_dir, f"X{display_num}"))
+        self._listener.listen(4)
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self) -> None:
+        self._listener.close()
+
+    def set_pixels(self, data: bytes) -> None:
+        with self._lock:
+            self.framebuffer[:] = data
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn, _ = self._listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _setup_reply(self) -> bytes:
+        vendor = b"fake"
+        body = struct.pack(
+            "<IIIIHHBBBBBBBB4x", 0, 0x200000, 0x1FFFFF, 0, len(vendor), 65535,
+            1, 1, 0, 0, 32, 32, MIN_KEYCODE, MAX_KEYCODE,
+        ) + vendor
+        body += struct.pack("<BBB5x", 24, 32, 32)
+        body += struct.pack(
+            "<IIIIIHHHHHHIBBBB", ROOT, 0x20, 0xFFFFFF, 0, 0, self.width, self.height,
+            0, 0, 1, 1, VISUAL, 0, 0, 24, 1,
+        )
+        body += struct.pack("<BxH4x", 24, 1)
+        body += struct.pack("<IBBHIII4x", VISUAL, 4, 8, 256, 0xFF0000, 0xFF00, 0xFF)
+        return struct.pack("<BxHHH", 1, 11, 0, len(body) // 4) + body
+
+    def _serve(self, conn: socket.socket) -> None:
+        buf = bytearray()
+
+        def read(n: int) -> bytes:
+            while len(buf) < n:
+                chunk = conn.recv(65536)
+                if not chunk:
+                    raise EOFError
+                buf.extend(chunk)
+            data = bytes(buf[:n])
+            del buf[:n]
+            return data
+
+        try:
+            head = read(12)
+            name_len, data_len = struct.unpack_from("<HH", head, 6)
+            read((name_len + 3) // 4 * 4 + (data_len + 3) // 4 * 4)
+            conn.sendall(self._setup_reply())
+
+            seq = 0
+            while True:
+                head = read(4)
+                length = struct.unpack_from("<H", head, 2)[0]
+                request = head + read(length * 4 - 4)
+                seq += 1
+                self.handle(conn, seq, request)
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def handle(self, conn: socket.socket, seq: int, request: bytes) -> None:
+        """处理一个请求 / Handle one request"""
+        opcode = request[0]
+        if opcode == 73:  # GetImage
+            x, y, w, h = struct.unpack_from("<hhHH", request, 8)
+            with self._lock:
+                stride = self.width * 4
+                data = b"".join(
+                    bytes(self.framebuffer[(y + r) * stride + x * 4:(y + r) * stride + (x + w) * 4])
+                    for r in range(h)
+                )
+            conn.sendall(struct.pack("<BBHII20x", 1, 24, seq, len(data) // 4, VISUAL) + data)
+            return
+        if opcode == 98:  # QueryExtension
+            name_len = struct.unpack_from("<H", request, 4)[0]
+            present = request[8:8 + name_len] == b"XTEST"
+            conn.sendall(struct.pack(
+                "<BxHIBBBB20x", 1, seq, 0, int(present), XTEST_OPCODE if present else 0, 0, 0
+            ))
+            return
+        if opcode == 101:  # GetKeyboardMapping
+            first, count = request[4], request[5]
+            keysyms = []
+            for keycode in range(first, first + count):
+                keysyms.extend(self.keymap.get(keycode, (0, 0)))
+            conn.sendall(struct.pack("<BBHI24x", 1, 2, seq, len(keysyms))
+                         + struct.pack(f"<{len(keysyms)}I", *keysyms))
+            return
+        if opcode == 43:  # GetInputFocus
+            self.syncs.append(seq)
+            conn.sendall(struct.pack("<BBHII20x", 1, 0, seq, 0, ROOT))
+            return
+        if opcode == XTEST_OPCODE:  # XTestFakeInput：与真实服务器一样等待延迟 / Honour the delay
+            time.sleep(struct.unpack_from("<I", request, 8)[0] / 1000)
+        if opcode == 100:  # ChangeKeyboardMapping
+            count, first, per_keycode = request[1], request[4], request[5]
+            keysyms = struct.unpack_from(f"<{count * per_keycode}I", request, 8)
+            for i in range(count):
+                row = keysyms[i * per_keycode:(i + 1) * per_keycode]
+                if any(row):
+                    self.keymap[first + i] = tuple(row[:2])
+                else:
+                    self.keymap.pop(first + i, None)
+        self.requests.append((seq, request))
@@ -0,0 +1,184 @@
+"""
+XTEST 输入注入测试 / Input injection tests
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+# 添加项目路径 / Add project path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devvnc.config import DevVNCConfig
+from devvnc.input import (
+    BUTTON_PRESS,
+    BUTTON_RELEASE,
+    FAKE_INPUT,
+    KEY_PRESS,
+    KEY_RELEASE,
+    MOTION_NOTIFY,
+)
+from devvnc.server import DevVNCServer
+from tests.fake_x11 import ROOT, XTEST_OPCODE, FakeXServer
+
+SHIFT, CTRL = 50, 37
+
+
+@pytest.fixture
+def x_server(tmp_path):
+    socket_dir = str(tmp_path / "x11")
+    server = FakeXServer(socket_dir, 7)
+    with patch("devvnc.x11.X11_SOCKET_DIR", socket_dir):
+        yield server
+    server.close()
+
+
+@pytest.fixture
+def session(x_server):
+    inp = DevVNCServer(config=DevVNCConfig(display_num=7)).input()
+    yield inp
+    inp.close()
+
+
+def _events(x_server):
+    """解码收到的 XTEST 事件 / Decode the XTEST events received"""
+    events = []
+    for _, request in x_server.requests:
+        if request[0] == XTEST_OPCODE:
+            _, _, _, kind, detail, _, delay, root, x, y, _ = FAKE_INPUT.unpack(request)
+            events.append((kind, detail, delay, root, x, y))
+    return events
+
+
+def _keys(x_server):
+    return [(kind, detail) for kind, detail, *_ in _events(x_server)]
+
+
+def _tap(keycode):
+    return [(KEY_PRESS, keycode), (KEY_RELEASE, keycode)]
+
+
+def _ctrl(keycode):
+    return [(KEY_PRESS, CTRL)] + _tap(keycode) + [(KEY_RELEASE, CTRL)]
+
+
+class TestInputSession:
+    """测试输入会话 / Test input session"""
+
+    def test_type_text(self, x_server, session):
+        """测试输入文本与 Shift 处理 / Test typing text with Shift handling"""
+        session.type("aA1!C\n").flush(sync=True)
+
+        assert _keys(x_server) == (
+            _tap(38)
+            + [(KEY_PRESS, SHIFT)] + _tap(38) + [(KEY_RELEASE, SHIFT)]
+            + _tap(10)
+            + [(KEY_PRESS, SHIFT)] + _tap(10) + _tap(54) + [(KEY_RELEASE, SHIFT)]
+            + _tap(36)
+        )
+
+    def test_unmapped_character(self, x_server, session):
+        """测试无映射字符绑定到空闲键码 / Test unmapped characters use a spare keycode"""
+        session.type("€").flush(sync=True)
+
+        remaps = [r for _, r in x_server.requests if r[0] == 100]
+        assert len(remaps) == 1
+        keycode = remaps[0][4]
+        assert int.from_bytes(remaps[0][8:12], "little") == 0x010020AC
+        assert _keys(x_server) == _tap(keycode)
+
+    def test_spare_keycodes_wrap(self, x_server):
+        """测试空闲键码用完一轮时先同步再重绑 / Test a sync happens before spares are rebound"""
+        spares = [200, 201]
+        x_server.keymap.update(
+            {k: (0xFFBE, 0) for k in range(8, 256) if k not in x_server.keymap and k not in spares}
+        )
+        session = DevVNCServer(config=DevVNCConfig(display_num=7)).input()
+        session.type("€₽₹").flush(sync=True)
+
+        remaps = [(seq, r[4]) for seq, r in x_server.requests if r[0] == 100]
+        assert [keycode for _, keycode in remaps] == [200, 201, 200]
+        # 第一次使用 200 之后、重绑之前有一次同步 / A sync between the first use of 200 and its rebind
+        first_use = next(seq for seq, r in x_server.requests if r[0] == XTEST_OPCODE)
+        assert any(first_use < sync < remaps[2][0] for sync in x_server.syncs)
+        assert x_server.keymap[200] == (0x010020B9, 0x010020B9)
+
+        # 关闭时恢复原映射 / The original mapping is restored on close
+        session.close()
+        assert 200 not in x_server.keymap and 201 not in x_server.keymap
+
+    def test_pause_longer_than_timeout(self, x_server, session):
+        """测试延迟超过套接字超时时同步不会超时 / Test sync waits out long server-side delays"""
+        session._conn._sock.settimeout(0.2)
+        session.pause(300).click(1).pause(100).click(1)
+        batch = session.flush(sync=True)
+
+        assert batch.sync_ms >= 400
+        assert session._conn._sock.gettimeout() == 0.2
+
+    def test_shifted_without_shift_key(self, x_server):
+        """测试没有 Shift 键时大写字母绑定到空闲键码 / Test capitals use a spare keycode without Shift"""
+        del x_server.keymap[SHIFT]
+        session = DevVNCServer(config=DevVNCConfig(display_num=7)).input()
+        try:
+            session.type("aA").flush(sync=True)
+        finally:
+            session.close()
+
+        remaps = [r for _, r in x_server.requests if r[0] == 100]
+        keycode = remaps[0][4]
+        assert int.from_bytes(remaps[0][8:12], "little") == ord("A")
+        assert _keys(x_server)[:4] == _tap(38) + _tap(keycode)
+
+    def test_keysym_names_and_plus(self, x_server, session):
+        """测试 X keysym 名称与加号组合键 / Test X keysym names and combos with the plus key"""
+        session.key("ctrl++").key("ctrl+plus").key("ctrl+KP_Enter").flush(sync=True)
+
+        remaps = [r for _, r in x_server.requests if r[0] == 100]
+        assert [int.from_bytes(r[8:12], "little") for r in remaps] == [ord("+"), 0xFF8D]
+        plus, enter = remaps[0][4], remaps[1][4]
+        assert _keys(x_server) == _ctrl(plus) + _ctrl(plus) + _ctrl(enter)
+
+        with pytest.raises(ValueError, match="Empty key name"):
+            session.key("ctrl+")
+
+    def test_key_combo(self, x_server, session):
+        """测试组合键自动加 Shift / Test combos add Shift automatically"""
+        session.key("ctrl+A").flush(sync=True)
+
+        assert _keys(x_server) == [
+            (KEY_PRESS, SHIFT), (KEY_PRESS, CTRL), (KEY_PRESS, 38),
+            (KEY_RELEASE, 38), (KEY_RELEASE, CTRL), (KEY_RELEASE, SHIFT),
+        ]
+
+    def test_pointer(self, x_server, session):
+        """测试指针移动、点击与滚动 / Test pointer motion, clicks and scrolling"""
+        session.click(1, x=5, y=6).pause(20).scroll(dy=2, dx=-1).flush(sync=True)
+
+        events = _events(x_server)
+        assert events[0] == (MOTION_NOTIFY, 0, 0, ROOT, 5, 6)
+        assert [(kind, detail) for kind, detail, *_ in events[1:]] == [
+            (BUTTON_PRESS, 1), (BUTTON_RELEASE, 1),
+            (BUTTON_PRESS, 5), (BUTTON_RELEASE, 5),
+            (BUTTON_PRESS, 5), (BUTTON_RELEASE, 5),
+            (BUTTON_PRESS, 6), (BUTTON_RELEASE, 6),
+        ]
+        assert events[3][2] == 20  # 服务器端延迟 / Server-side delay
+
+    def test_batch_stats(self, x_server, session):
+        """测试批量写出与统计 / Test batched writes and statistics"""
+        session.type("a" * 100)
+        batch = session.flush(sync=True)
+
+        assert batch.events == 200
+        assert batch.bytes == 200 * FAKE_INPUT.size
+        assert batch.sync_ms > 0
+        assert session.stats.batches == 1
+        assert session.stats.last is batch
+        assert len(_events(x_server)) == 200
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
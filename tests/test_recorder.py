@@ -0,0 +1,225 @@
+"""
+会话录制测试 / Recording tests
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+# 添加项目路径 / Add project path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devvnc.recorder import (
+    HEADER,
+    KIND_DELTA,
+    KIND_KEY,
+    TRAILER,
+    Recorder,
+    Recording,
+    RecordingHeader,
+    RecordingWriter,
+    apply_delta,
+    encode_delta,
+    export_frames,
+)
+from tests.fake_x11 import FakeXServer
+
+WIDTH, HEIGHT = 100, 50
+
+
+def _header(tile_size: int = 16) -> RecordingHeader:
+    return RecordingHeader(
+        width=WIDTH, height=HEIGHT, tile_size=tile_size, bytes_per_pixel=4, msb_first=False,
+        red_mask=0xFF0000, green_mask=0xFF00, blue_mask=0xFF, start_time=0.0,
+    )
+
+
+def _paint(frame: bytearray, x: int, y: int, w: int, h: int, value: int) -> bytearray:
+    """在帧上画一个矩形 / Paint a rectangle on a frame"""
+    frame = bytearray(frame)
+    for row in range(y, y + h):
+        start = (row * WIDTH + x) * 4
+        frame[start:start + w * 4] = bytes([value]) * (w * 4)
+    return frame
+
+
+@pytest.fixture
+def frames():
+    rng = random.Random(1)
+    first = bytearray(rng.getrandbits(8) for _ in range(WIDTH * HEIGHT * 4))
+    second = _paint(first, 96, 48, 4, 2, 0xAA)  # 右下角的边缘瓦片 / Bottom-right edge tile
+    third = _paint(second, 5, 5, 30, 3, 0x11)
+    return [bytes(first), bytes(second), bytes(third)]
+
+
+def _write(path, frames, close=True):
+    header = _header()
+    f = open(path, "wb")
+    writer = RecordingWriter(f, header, memory_budget=WIDTH * HEIGHT * 4)
+    writer.add_frame(KIND_KEY, 0, 0, frames[0])
+    for i in range(1, len(frames)):
+        tiles, payload = encode_delta(frames[i - 1], frames[i], header)
+        writer.add_frame(KIND_DELTA, i * 1000, tiles, payload)
+    writer.close(duration_ms=len(frames) * 1000)
+    f.close()
+    if not close:
+        # 模拟崩溃：去掉索引和尾部 / Simulate a crash: drop index and trailer
+        data = path.read_bytes()
+        path.write_bytes(data[:int.from_bytes(data[-TRAILER.size:-8], "little")])
+
+
+class TestDeltaEncoding:
+    """测试差分编码 / Test delta encoding"""
+
+    def test_roundtrip(self, frames):
+        """测试差分编码往返 / Test delta round trip"""
+        header = _header()
+        tiles, payload = encode_delta(frames[0], frames[1], header)
+        assert tiles == 1
+
+        tiles, payload = encode_delta(frames[1], frames[2], header)
+        assert tiles == 3  # 横跨三个瓦片 / Spans three tiles
+
+        frame = bytearray(frames[1])
+        apply_delta(frame, payload, header)
+        assert bytes(frame) == frames[2]
+
+    def test_identical_frames(self, frames):
+        """测试相同帧没有差分 / Test identical frames produce no delta"""
+        assert encode_delta(frames[0], frames[0], _header()) == (0, b"")
+
+
+class TestRecording:
+    """测试录制文件读写 / Test recording files"""
+
+    def test_seek(self, tmp_path, frames):
+        """测试按时间定位 / Test seeking by time"""
+        path = tmp_path / "rec.dvr"
+        _write(path, frames)
+
+        with Recording(str(path)) as rec:
+            assert rec.complete
+            assert rec.frame_count == 3
+            assert rec.duration == 3.0
+            assert rec.frame_at(0.5) == frames[0]
+            assert rec.frame_at(1.0) == frames[1]
+            assert rec.frame_at(2.9) == frames[2]
+            assert [t for t, _ in rec.frames(1.5)] == [1.0, 2.0]
+
+    def test_recover_without_index(self, tmp_path, frames):
+        """测试无索引文件顺序扫描恢复 / Test recovery without an index"""
+        path = tmp_path / "rec.dvr"
+        _write(path, frames, close=False)
+
+        with Recording(str(path)) as rec:
+            assert not rec.complete
+            assert rec.frame_count == 3
+            assert rec.frame_at(2.0) == frames[2]
+
+    def test_truncated_mid_frame(self, tmp_path, frames):
+        """测试写到一半的帧被忽略 / Test a partially written frame is ignored"""
+        path = tmp_path / "rec.dvr"
+        _write(path, frames, close=False)
+        data = path.read_bytes()
+        path.write_bytes(data[:-10])
+
+        with Recording(str(path)) as rec:
+            assert not rec.complete
+            assert rec.frame_count == 2
+            assert rec.frame_at(5.0) == frames[1]
+
+    def test_short_file(self, tmp_path):
+        """测试空文件和文件头不完整时报 ValueError / Test empty and short files raise ValueError"""
+        path = tmp_path / "rec.dvr"
+        for data in (b"", b"DVNCREC1\x01\x00"):
+            path.write_bytes(data)
+            with pytest.raises(ValueError):
+                Recording(str(path))
+
+    def test_cli_rejects_bad_input(self, tmp_path):
+        """测试命令行拒绝非正帧率并报告短文件 / Test the CLI rejects bad fps and short files"""
+        from devvnc.cli import main
+
+        path = tmp_path / "rec.dvr"
+        path.write_bytes(b"")
+        assert main(["replay", str(path)]) == 1
+        for command in (["record", "start"], ["replay", str(path), "--export", str(tmp_path)]):
+            with pytest.raises(SystemExit) as exc:
+                main(command + ["--fps", "0"])
+            assert exc.value.code == 2
+
+    def test_writer_error(self, tmp_path, frames):
+        """测试写入线程出错时不会永久阻塞 / Test writer errors are raised, not hung on"""
+        f = open(tmp_path / "rec.dvr", "wb")
+        writer = RecordingWriter(f, _header(), memory_budget=WIDTH * HEIGHT * 4)
+        f.close()  # 后续写入失败 / Later writes fail
+
+        with pytest.raises(ValueError):
+            for i in range(10):
+                writer.add_frame(KIND_KEY, i, 0, frames[0])
+        with pytest.raises(ValueError):
+            writer.close()
+
+    def test_invalid_fps(self, tmp_path, frames):
+        """测试非正帧率被拒绝 / Test non-positive frame rates are rejected"""
+        path = tmp_path / "rec.dvr"
+        _write(path, frames)
+
+        with Recording(str(path)) as rec, pytest.raises(ValueError):
+            export_frames(rec, str(tmp_path / "out"), fps=0)
+        with pytest.raises(ValueError):
+            Recorder(7, str(path), fps=-1)
+
+    def test_export(self, tmp_path, frames):
+        """测试导出 PPM 序列 / Test PPM sequence export"""
+        path = tmp_path / "rec.dvr"
+        _write(path, frames)
+
+        with Recording(str(path)) as rec:
+            count = export_frames(rec, str(tmp_path / "out"), fps=2)
+            ppm = rec.to_ppm(frames[0])
+
+        assert count == 7
+        first = (tmp_path / "out" / "frame_000000.ppm").read_bytes()
+        assert first == ppm
+        assert first.startswith(f"P6\n{WIDTH} {HEIGHT}\n255\n".encode())
+        # BGRX -> RGB
+        pixels = first[len(f"P6\n{WIDTH} {HEIGHT}\n255\n"):]
+        assert pixels[:3] == bytes([frames[0][2], frames[0][1], frames[0][0]])
+
+
+class TestRecorder:
+    """测试录制器 / Test recorder"""
+
+    def test_record_fake_display(self, tmp_path):
+        """测试从假 X 服务器录制 / Test recording from a fake X server"""
+        socket_dir = str(tmp_path / "x11")
+        server = FakeXServer(socket_dir, 7, width=WIDTH, height=HEIGHT)
+        path = tmp_path / "rec.dvr"
+
+        with patch("devvnc.x11.X11_SOCKET_DIR", socket_dir):
+            recorder = Recorder(7, str(path), fps=50, tile_size=16, keyframe_interval=0.05)
+            thread = threading.Thread(target=recorder.run)
+            thread.start()
+            time.sleep(0.2)
+            server.set_pixels(bytes(_paint(bytearray(WIDTH * HEIGHT * 4), 10, 10, 5, 5, 0x7F)))
+            time.sleep(0.2)
+            recorder.stop_event.set()
+            thread.join(5)
+        server.close()
+
+        with Recording(str(path)) as rec:
+            assert rec.complete
+            # 静止画面不产生帧，包括关键帧 / Idle screens add no frames, keyframes included
+            assert rec.frame_count == 2
+            assert [kind for kind, *_ in rec._scan(HEADER.size)] == [KIND_KEY, KIND_KEY]
+            assert rec.frame_at(rec.duration) == bytes(server.framebuffer)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -3,7 +3,9 @@ Dev VNC Server 测试 / Tests
 """
 
 import os
+import subprocess
 import sys
+import time
 from unittest.mock import patch, MagicMock
 
 import pytest
@@ -13,6 +15,19 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from devvnc.config import DevVNCConfig
 from devvnc.server import DevVNCServer
+from devvnc import sysinfo
+
+
+def _spawn_sleep() -> subprocess.Popen:
+    """启动测试用进程并等待 exec 完成 / Spawn a test process and wait for exec"""
+    proc = subprocess.Popen(["sleep", "29.75"])
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with open(f"/proc/{proc.pid}/cmdline", "rb") as f:
+            if f.read().startswith(b"sleep"):
+                break
+        time.sleep(0.01)
+    return proc
 
 
 class TestDevVNCConfig:
@@ -72,15 +87,16 @@ class TestDevVNCServer:
         
         assert server.config.vnc_port == 6000
     
+    @patch("devvnc.server.sysinfo.scan_processes", return_value=None)
     @patch("devvnc.server.subprocess.run")
-    def test_check_process(self, mock_run):
-        """测试进程检查 / Test process check"""
-        mock_run.return_value = MagicMock(returncode=0)
+    def test_pgrep_fallback(self, mock_run, mock_scan):
+        """测试没有 /proc 时退回 pgrep / Test the pgrep fallback without /proc"""
+        mock_run.return_value = MagicMock(returncode=0, stdout="123\n456\n")
         
         server = DevVNCServer()
-        result = server._check_process("test")
+        result = server._find_processes({"test": "test"})
         
-        assert result is True
+        assert result == {"test": [123, 456]}
         mock_run.assert_called_once()
     
     def test_get_status(self):
@@ -100,6 +116,129 @@ class TestDevVNCServer:
         
         assert ip is not None
 
+    
+    def test_component_pids_from_proc(self):
+        """测试通过 /proc 查找组件进程 / Test component lookup via /proc"""
+        proc = _spawn_sleep()
+        try:
+            server = DevVNCServer(config=DevVNCConfig(window_manager="sleep 29.75"))
+            pids = server.get_component_pids()
+            
+            assert proc.pid in pids["window_manager"]
+            assert server.get_status()["window_manager"] is True
+        finally:
+            proc.kill()
+            proc.wait()
+    
+    def test_watch_status_pushes_exit(self):
+        """测试进程退出被立即推送 / Test process exit is pushed immediately"""
+        proc = _spawn_sleep()
+        server = DevVNCServer()
+        patterns = {"wm": ["^sleep 29.75$"]}
+        try:
+            with patch.object(server, "_component_patterns", return_value=patterns):
+                events = server.watch_status(interval=30)
+                snapshot = next(events)
+                assert proc.pid in snapshot["components"]["wm"]["pids"]
+                
+                proc.kill()
+                proc.wait()
+                start = time.monotonic()
+                change = next(events)
+        finally:
+            proc.kill()
+            proc.wait()
+        
+        assert change["event"] == "change"
+        assert change["component"] == "wm"
+        assert proc.pid not in change["pids"]
+        assert time.monotonic() - start < 5
+
+    
+    def test_stale_recorder_pid(self, tmp_path):
+        """测试被复用的录制 PID 不会被当作录制进程 / Test a reused recorder PID is ignored"""
+        proc = _spawn_sleep()
+        try:
+            server = DevVNCServer(config=DevVNCConfig(run_dir=tmp_path))
+            pid_file = tmp_path / "recorder.pid"
+            pid_file.write_text(str(proc.pid))
+            
+            assert server._recorder_pid() is None
+            assert not pid_file.exists()
+            assert proc.poll() is None
+        finally:
+            proc.kill()
+            proc.wait()
+
+
+class TestSysInfo:
+    """测试系统信息 / Test system information"""
+    
+    def test_match_processes(self):
+        """测试一次扫描匹配多个模式 / Test matching several patterns in one pass"""
+        processes = [(10, "Xvfb :99 -screen 0 1920x1080x24"), (11, "x11vnc -display :99")]
+        matches = sysinfo.match_processes(
+            {"xvfb": "Xvfb :99", "x11vnc": "x11vnc.*:99", "wm": "fluxbox"}, processes
+        )
+        
+        assert matches == {"xvfb": [10], "x11vnc": [11], "wm": []}
+    
+    def _fake_proc(self, tmp_path, default=None):
+        """写入假的 /proc/net/dev 与 /proc/net/route / Write fake /proc/net/dev and route"""
+        net = tmp_path / "net"
+        net.mkdir()
+        (net / "dev").write_text(
+            "Inter-|   Receive\n face |bytes\n"
+            "    lo: 0 0 0\n  eth0: 0 0 0\n  eth1: 0 0 0\n docker0: 0 0 0\n  wg0: 0 0 0\n"
+        )
+        route = "Iface\tDestination\tGateway\tFlags\n"
+        route += "eth0\t0000A8C0\t00000000\t0001\n"
+        if default:
+            route += f"{default}\t00000000\t0100A8C0\t0003\n"
+        (net / "route").write_text(route)
+    
+    def _primary_ip(self, tmp_path, default=None, addresses=None):
+        self._fake_proc(tmp_path, default)
+        addresses = addresses or {
+            "lo": "127.0.0.1", "eth0": "192.168.0.5", "eth1": "10.0.0.7", "docker0": "172.17.0.1",
+        }
+        with patch.object(sysinfo, "PROC", str(tmp_path)), \
+                patch.object(sysinfo, "_interface_address",
+                             side_effect=lambda sock, name: addresses.get(name)):
+            return sysinfo.get_interfaces(), sysinfo.primary_ip()
+    
+    def test_get_interfaces(self, tmp_path):
+        """测试从 /proc/net/dev 枚举网卡，跳过无地址网卡 / Test enumeration skips interfaces without IPv4"""
+        interfaces, _ = self._primary_ip(tmp_path)
+        
+        assert interfaces == {
+            "lo": "127.0.0.1", "eth0": "192.168.0.5", "eth1": "10.0.0.7", "docker0": "172.17.0.1",
+        }
+    
+    def test_primary_ip_default_route(self, tmp_path):
+        """测试默认路由网卡优先 / Test the default-route interface is preferred"""
+        _, ip = self._primary_ip(tmp_path, default="eth1")
+        
+        assert ip == "10.0.0.7"
+    
+    def test_primary_ip_fallback(self, tmp_path):
+        """测试没有默认路由时跳过回环地址 / Test loopback is skipped without a default route"""
+        _, ip = self._primary_ip(tmp_path)
+        assert ip == "192.168.0.5"
+        
+        # 默认路由网卡没有地址时同样回退 / Same fallback when the default interface has no address
+        proc = tmp_path / "proc"
+        proc.mkdir()
+        _, ip = self._primary_ip(proc, default="wg0", addresses={
+            "lo": "127.0.0.1", "eth0": "127.0.1.1", "eth1": "10.0.0.7",
+        })
+        assert ip == "10.0.0.7"
+    
+    def test_primary_ip_loopback_only(self, tmp_path):
+        """测试只有回环地址时返回 None / Test None is returned with only loopback"""
+        _, ip = self._primary_ip(tmp_path, addresses={"lo": "127.0.0.1"})
+        
+        assert ip is None
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,155 @@
+"""
+noVNC 静态资源服务器测试 / Asset server tests
+"""
+
+import gzip
+import http.client
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+# 添加项目路径 / Add project path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devvnc.webserver import AssetCache, make_server
+
+
+@pytest.fixture
+def web_root(tmp_path):
+    (tmp_path / "vnc.html").write_text("<html>" + "noVNC " * 200 + "</html>")
+    (tmp_path / "core").mkdir()
+    (tmp_path / "core" / "rfb.js").write_text("export default class RFB {}\n" * 50)
+    (tmp_path / "app.png").write_bytes(b"\x89PNG" + bytes(1000))
+    return tmp_path
+
+
+@pytest.fixture
+def server(web_root):
+    # 上游 "websockify"：回显收到的数据 / Upstream "websockify" echoing what it receives
+    upstream = socket.socket()
+    upstream.bind(("127.0.0.1", 0))
+    upstream.listen(1)
+
+    def echo():
+        conn, _ = upstream.accept()
+        with conn:
+            while data := conn.recv(4096):
+                conn.sendall(data)
+
+    threading.Thread(target=echo, daemon=True).start()
+
+    srv = make_server(
+        str(web_root), 0, upstream.getsockname()[1], host="127.0.0.1", proxy_host="127.0.0.1"
+    )
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    upstream.close()
+
+
+def _get(srv, path, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", srv.server_address[1])
+    conn.request("GET", path, headers=headers or {})
+    resp = conn.getresponse()
+    body = resp.read()
+    conn.close()
+    return resp, body
+
+
+class TestAssetCache:
+    """测试资源缓存 / Test asset cache"""
+
+    def test_build_index(self, web_root):
+        """测试索引与预压缩 / Test index and precompression"""
+        cache = AssetCache(str(web_root))
+        assert cache.build() == 3
+
+        js = cache.get("/core/rfb.js")
+        assert js.content_type.startswith("application/javascript")
+        assert gzip.decompress(js.gzip_body) == js.body
+
+        # 二进制图片不压缩 / Binary images are not compressed
+        assert cache.get("/app.png").gzip_body is None
+        assert cache.get("/../etc/passwd") is None
+
+    def test_symlink_loop(self, web_root):
+        """测试符号链接循环不会无限遍历 / Test symlink loops are not followed forever"""
+        (web_root / "core" / "loop").symlink_to(web_root)
+        cache = AssetCache(str(web_root))
+
+        assert cache.build() == 3
+        assert cache.get("/core/loop/vnc.html") is None
+
+    def test_reload_on_mtime_change(self, web_root):
+        """测试 mtime 变化后重新加载 / Test reload after mtime change"""
+        cache = AssetCache(str(web_root))
+        cache.build()
+        old_etag = cache.get("/vnc.html").etag
+
+        path = web_root / "vnc.html"
+        path.write_text("<html>changed</html>")
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        asset = cache.get("/vnc.html")
+        assert asset.body == b"<html>changed</html>"
+        assert asset.etag != old_etag
+
+
+class TestNoVNCServer:
+    """测试 HTTP 服务 / Test HTTP serving"""
+
+    def test_gzip_and_etag(self, server):
+        """测试 gzip 响应与 304 / Test gzip response and 304"""
+        resp, body = _get(server, "/core/rfb.js", {"Accept-Encoding": "gzip, deflate"})
+        assert resp.status == 200
+        assert resp.getheader("Content-Encoding") == "gzip"
+        assert resp.getheader("Cache-Control") == "no-cache"
+        assert gzip.decompress(body).startswith(b"export default")
+
+        etag = resp.getheader("ETag")
+        resp, body = _get(
+            server, "/core/rfb.js", {"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+        assert resp.status == 304
+        assert body == b""
+
+    def test_identity_and_redirect(self, server):
+        """测试未压缩响应、重定向和 404 / Test identity response, redirect and 404"""
+        resp, body = _get(server, "/vnc.html")
+        assert resp.status == 200
+        assert resp.getheader("Content-Encoding") is None
+        assert resp.getheader("Cache-Control") == "no-cache"
+        assert body.startswith(b"<html>")
+
+        resp, _ = _get(server, "/")
+        assert resp.status == 302
+        assert resp.getheader("Location") == "/vnc.html"
+
+        resp, _ = _get(server, "/missing.js")
+        assert resp.status == 404
+
+    def test_websocket_forwarded(self, server):
+        """测试 WebSocket 请求转发到代理 / Test WebSocket upgrade is forwarded"""
+        request = (
+            b"GET /websockify HTTP/1.1\r\n"
+            b"Host: localhost\r\n"
+            b"Upgrade: websocket\r\n"
+            b"Connection: Upgrade\r\n\r\n"
+        )
+        with socket.create_connection(("127.0.0.1", server.server_address[1])) as sock:
+            sock.sendall(request)
+            received = b""
+            while len(received) < len(request):
+                received += sock.recv(4096)
+
+        assert received.startswith(b"GET /websockify HTTP/1.1\r\n")
+        assert b"Upgrade: websocket\r\n" in received
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])